@@ -0,0 +1,160 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from src.models.gt_game_class import create_n_player_game
+from src.models.gt_block_generator import potential_support_pairs, block_game
+from src.models.gt_utils import admissible_block, is_strategy_better
+from src.models.gt_index_calc import calculate_index
+from src.models.zero_solver import zero_solver
+from src.models.gt_get_all_ne_generic import ne_solver
+from src.models.gt_min_gb_generic import min_game_blocks
+
+# Timings of the hot paths of the solver pipeline on seeded random games, written as JSON so that
+# the results of two commits can be compared with --compare.
+
+SHAPES = [(2, 2), (3, 3), (4, 4), (5, 5), (6, 6), (7, 7), (8, 8), (3, 3, 3), (2, 2, 2, 2)]
+
+def random_game(shape, seed):
+    rng = np.random.default_rng([seed, *shape])
+    n = len(shape)
+    return create_n_player_game([rng.normal(size=(shape[p], *[shape[q] for q in range(n) if q != p]))
+                                 for p in range(n)])
+
+def block_games(game):
+    return [create_n_player_game(block_game(game.payoffs, indices)) for indices in potential_support_pairs(game)]
+
+def random_profile(game, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.dirichlet(np.ones(num)) for num in game.num_strategies]
+
+def pure_profile(game):
+    return [np.eye(num)[0] for num in game.num_strategies]
+
+# Each benchmark takes a game and returns the function to time, so that setup is not timed
+
+def bench_potential_support_pairs(game):
+    return lambda: sum(1 for _ in potential_support_pairs(game))
+
+def bench_block_game(game):
+    supports = list(potential_support_pairs(game))
+    return lambda: [block_game(game.payoffs, indices) for indices in supports]
+
+def bench_admissible_block(game):
+    blocks = block_games(game)
+    return lambda: [admissible_block(bg) for bg in blocks]
+
+def bench_zero_solver(game):
+    blocks = [bg for bg in block_games(game) if admissible_block(bg)]
+    return lambda: [zero_solver(bg, 1e-6) for bg in blocks]
+
+def bench_is_strategy_better(game):
+    profile = random_profile(game, 0)
+    return lambda: [is_strategy_better(game, profile, p, s)
+                    for p in range(game.num_players) for s in range(game.num_strategies[p])]
+
+def bench_calculate_index(game):
+    profiles = [random_profile(game, seed) for seed in range(10)] + [pure_profile(game)]
+    return lambda: [calculate_index(game, profile) for profile in profiles]
+
+def bench_ne_solver(game):
+    return lambda: ne_solver(game)
+
+def bench_min_game_blocks(game):
+    return lambda: list(min_game_blocks(game))
+
+BENCHMARKS = {
+    'potential_support_pairs': bench_potential_support_pairs,
+    'block_game': bench_block_game,
+    'admissible_block': bench_admissible_block,
+    'zero_solver': bench_zero_solver,
+    'is_strategy_better': bench_is_strategy_better,
+    'calculate_index': bench_calculate_index,
+    'ne_solver': bench_ne_solver,
+    'min_game_blocks': bench_min_game_blocks,
+}
+
+def time_function(function, repeat, min_time):
+    """ Run the function at least repeat times and until min_time seconds have passed; returns the timings"""
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - start < min_time:
+        tic = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - tic)
+    return timings
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(names, shapes, seed, repeat, min_time):
+    results = []
+    for shape in shapes:
+        game = random_game(shape, seed)
+        for name in names:
+            timings = time_function(BENCHMARKS[name](game), repeat, min_time)
+            result = {'benchmark': name, 'shape': list(shape), 'runs': len(timings),
+                      'min': min(timings), 'median': statistics.median(timings), 'max': max(timings)}
+            results.append(result)
+            print(f"{name:<24} {str(shape):<14} median {result['median']:.6f} s  min {result['min']:.6f} s",
+                  flush=True)
+    return {'commit': git_commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'seed': seed, 'results': results}
+
+def compare(baseline_path, current_path, threshold):
+    """ Print the ratio of the median timings of two result files; returns the regressions beyond threshold"""
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], tuple(r['shape'])): r for r in json.load(f)['results']}
+    with open(current_path) as f:
+        current = {(r['benchmark'], tuple(r['shape'])): r for r in json.load(f)['results']}
+
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys()):
+        ratio = current[key]['median'] / baseline[key]['median']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{key[0]:<24} {str(key[1]):<14} {baseline[key]['median']:.6f} s -> {current[key]['median']:.6f} s"
+              f"  x{ratio:.2f}{flag}")
+    return regressions
+
+def parse_shape(text):
+    return tuple(int(num) for num in text.split('x'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the solver pipeline on seeded random games.')
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='Benchmarks to run (default: all).')
+    parser.add_argument('-s', '--shapes', nargs='+', type=parse_shape, default=SHAPES,
+                        help='Game shapes such as 3x3 or 2x2x2x2 (default: 2x2 up to 8x8, 3x3x3 and 2x2x2x2).')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random games.')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Minimum number of runs of each benchmark.')
+    parser.add_argument('--min_time', type=float, default=0.2,
+                        help='Minimum time in seconds spent on each benchmark.')
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='File to write the results to.')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two result files instead of running the benchmarks.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown of the median reported as a regression by --compare.')
+
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    report = run_benchmarks(args.benchmarks, args.shapes, args.seed, args.repeat, args.min_time)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
@@ -0,0 +1,88 @@
+import argparse
+import json
+import math
+import os
+from collections import Counter
+from src.data.gt_results_store import read_records
+
+# Summary statistics over the game records of one or more ResultsStore files, grouped by game shape.
+# The records are streamed one at a time, so memory use depends on the number of shapes and distinct
+# values counted, not on the number of games. Only the stores of shards of a sharded sweep, which hold at
+# most shard_size games each, can hold a game twice; their games are read with read_records(unique=True).
+
+class RunningStats:
+    """ Count, mean, variance (Welford's method), minimum, maximum and total of a stream of numbers"""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.total = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.total += value
+
+    def as_dict(self):
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {'count': self.count, 'mean': self.mean, 'std': std, 'min': self.min, 'max': self.max,
+                'total': self.total}
+
+class ShapeSummary:
+    """ Statistics of the records of one game shape"""
+    def __init__(self):
+        self.ne = RunningStats()
+        self.seconds = RunningStats()
+        self.ne_counts = Counter()
+        self.indices = Counter()
+        self.block_sizes = Counter()
+        self.counters = Counter()
+
+    def add(self, record):
+        self.ne.add(record['ne'])
+        self.seconds.add(record['seconds'])
+        self.ne_counts[record['ne']] += 1
+        self.indices.update(record['indices'])
+        self.block_sizes.update(sum(len(index) for index in block) for block in record['min_blocks'])
+        self.counters.update(record['counters'])
+
+    def as_dict(self):
+        return {'games': self.ne.count,
+                'ne': self.ne.as_dict(),
+                'ne_distribution': {str(k): v for k, v in sorted(self.ne_counts.items())},
+                'index_distribution': {str(k): v for k, v in sorted(self.indices.items())},
+                'min_block_sizes': {str(k): v for k, v in sorted(self.block_sizes.items())},
+                'seconds': self.seconds.as_dict(),
+                'counters': dict(sorted(self.counters.items()))}
+
+def aggregate(paths):
+    """ Summary of the records in the files, keyed by game shape"""
+
+    summaries = {}
+    for path in paths:
+        for record in read_records(path, unique=os.path.basename(path).startswith('shard_')):
+            summaries.setdefault(record['shape'], ShapeSummary()).add(record)
+    return {shape: summary.as_dict() for shape, summary in sorted(summaries.items())}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize the game records written by the simulations.')
+    parser.add_argument('paths', nargs='+',
+                        help='Results store files (games_*.csv) to summarize.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='File to write the summary to as JSON (default: print it).')
+
+    args = parser.parse_args()
+
+    summary = aggregate(args.paths)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary saved to: {args.output}")
+    else:
+        print(json.dumps(summary, indent=2))
@@ -0,0 +1,106 @@
+import csv
+import json
+import os
+from itertools import islice
+
+class ResultsStore:
+    """
+    An append-only CSV file with one record per simulated game, written as each game completes.
+
+    ...
+
+    Every row is flushed and synced to disk before the next one is written, so a crash or preemption
+    loses at most the games that were still running. A game is identified by the run seed and its game
+    number, from which its payoffs are drawn, so runs with different seeds can share a store. A store that
+    holds rows is only started over with overwrite. Besides the number of equilibria, a record holds the shape
+    of the game, the indices of the equilibria, the supports of the minimal blocks, the solve time and the
+    stage counters; the list and dict columns are stored as JSON and decoded again by read_records.
+
+    Attributes
+    ----------
+    path : str
+        path of the CSV file
+    fields : list
+        column names of the rows
+
+    Methods
+    -------
+    completed(run_seed)
+        returns the stored records of a run, keyed by game number
+    append(row)
+        writes one row (a dict keyed by fields) and syncs it to disk
+    """
+    fields = ['run_seed', 'game', 'shape', 'ne', 'indices', 'min_blocks', 'seconds', 'counters']
+
+    def __init__(self, path, resume=False, overwrite=False):
+        self.path = path
+        if not resume and not overwrite and has_rows(path):
+            raise FileExistsError(f"{path} already holds results; resume it (--resume) to add to them or "
+                                  f"overwrite it (--overwrite)")
+        if not resume or not os.path.exists(path):
+            with open(path, 'w', newline='') as csvfile:
+                csv.DictWriter(csvfile, fieldnames=self.fields).writeheader()
+            return
+        with open(path, newline='') as csvfile:
+            header = next(csv.reader(csvfile), None)
+        if header != self.fields:
+            raise ValueError(f"{path} has the columns {header}, not {self.fields}; it cannot be resumed")
+        # Drop a row cut short by a crash. Its JSON columns may end inside an open quote, which would take in
+        # the next row, so the file is truncated back to the end of the last complete row.
+        with open(path, 'rb+') as csvfile:
+            data = csvfile.read()
+            if data and not data.endswith(b'\n'):
+                csvfile.truncate(data.rfind(b'\n') + 1)
+
+    def completed(self, run_seed):
+        return {record['game']: record for record in read_records(self.path) if record['run_seed'] == run_seed}
+
+    def append(self, row):
+        row = {field: json.dumps(value) if isinstance(value, (list, dict)) else value for field, value in row.items()}
+        with open(self.path, 'a', newline='') as csvfile:
+            csv.DictWriter(csvfile, fieldnames=self.fields).writerow(row)
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+
+def has_rows(path):
+    """ Whether the file exists and has a line after the header"""
+
+    if not os.path.exists(path):
+        return False
+    with open(path, newline='') as csvfile:
+        return len(list(islice(csvfile, 2))) > 1
+
+def decode_row(row):
+    """ The record of a row with the columns decoded, or None for a row that is incomplete or cannot be decoded"""
+
+    # A row cut short by a crash has empty trailing fields or a broken JSON column
+    if None in row.values() or '' in row.values():
+        return None
+    try:
+        return {'run_seed': int(row['run_seed']),
+                'game': int(row['game']),
+                'shape': row['shape'],
+                'ne': int(row['ne']),
+                'indices': json.loads(row['indices']),
+                'min_blocks': json.loads(row['min_blocks']),
+                'seconds': float(row['seconds']),
+                'counters': json.loads(row['counters'])}
+    except ValueError:
+        return None
+
+def read_records(path, unique=False):
+    """ Stream the complete records of a ResultsStore file one at a time, with the columns decoded. A game can be
+    stored twice in the store of a shard when a worker of a sharded sweep lost its lease while solving it; with
+    unique only its first record is kept, at the cost of remembering the games read."""
+
+    seen = set()
+    with open(path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            record = decode_row(row)
+            if record is None:
+                continue
+            if unique:
+                if (record['run_seed'], record['game']) in seen:
+                    continue
+                seen.add((record['run_seed'], record['game']))
+            yield record
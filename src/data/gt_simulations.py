@@ -2,13 +2,27 @@ import numpy as np
 import time
 from src.models.gt_game_class import create_n_player_game
 from src.models.gt_min_gb_generic import min_game_blocks
+from src.models.gt_batch import batch_min_game_blocks
 from multiprocessing import Pool, cpu_count 
+from itertools import chain, islice
 import argparse
 import os  # Import the os module
 import csv
-
-#A function to generate payoffs given touple of number of strategies for each player
-def generate_payoffs(num_strategies):
+import threading
+from queue import SimpleQueue
+import socket
+from src.data.gt_results_store import ResultsStore
+from src.data.gt_work_queue import WorkQueue, hold_lease
+from src.models.gt_instrumentation import instrumented
+
+#Random generator of one game, derived from the seed of the run and the number of the game, so that every
+#game of a run is reproducible and no two worker processes draw the same payoffs
+def game_rng(run_seed, game_number):
+    return np.random.default_rng([run_seed, game_number])
+
+#A function to generate payoffs given touple of number of strategies for each player (drawn from rng,
+#the global numpy random state by default)
+def generate_payoffs(num_strategies, rng=np.random):
     payoffs = []
     num_players = len(num_strategies)
     # Generate payoffs for each player
@@ -17,100 +31,232 @@ def generate_payoffs(num_strategies):
         num_strategies_player = [num_strategies[player]] + num_strategies_without_player
 
         # Generate payoffs for each strategy combination
-        strategy_combinations = np.product(num_strategies_player)
-        player_payoffs = np.random.normal(0, 1, strategy_combinations).reshape(*num_strategies_player).tolist()
+        strategy_combinations = np.prod(num_strategies_player)
+        player_payoffs = rng.normal(0, 1, strategy_combinations).reshape(*num_strategies_player)
 
         # Assign payoffs to the player
         payoffs.append(player_payoffs)
 
     return payoffs
 
-#Simulations of two player games ns-times and games with up to Sn strategies for player n
-def simulation_worker1(params):
-    S1, S2 = params  # Unpack only S1 and S2
-
-    current_ne = 0
-    random_payoffs = generate_payoffs([S1, S2])
-    random_game = create_n_player_game(random_payoffs)
-
-    for mgb in min_game_blocks(random_game):
-        current_ne += len(mgb[1])
-
-    return current_ne
-
-def simulations(ns, S1, S2, num_processes=4):
-    list_game = {}
-    n_ne = 0  # Track total NE across all simulations
+#Record of a solved game: its shape, the number of equilibria counted in its minimal blocks, the indices of those
+#equilibria, the supports of the minimal blocks, the seconds spent solving it and the stage counters
+def game_record(game, mgbs, seconds, counters):
+    return {'shape': 'x'.join(str(num) for num in game.num_strategies),
+            'ne': sum(len(mgb[1]) for mgb in mgbs),
+            'indices': [int(ne[1]) for mgb in mgbs for neis in mgb[1] for ne in neis],
+            'min_blocks': [[list(index) for index in mgb[0]] for mgb in mgbs],
+            'seconds': seconds,
+            'counters': counters}
+
+def solve_game(game, block_processes=None):
+    tic = time.perf_counter()
+    with instrumented() as stats:
+        mgbs = list(min_game_blocks(game, processes=block_processes, shared_memory=block_processes is not None))
+    return game_record(game, mgbs, time.perf_counter() - tic, stats.counters)
 
+#Records of the games of a batch; the solve time is the batch's time split evenly, and there are no stage counters
+def solve_batch(games):
     tic = time.perf_counter()
+    results = batch_min_game_blocks(games)
+    seconds = (time.perf_counter() - tic) / len(games)
+    return [game_record(game, mgbs, seconds, {}) for game, mgbs in zip(games, results)]
 
-    # Generate parameters for worker processes (no more i)
-    sim_params = [(S1, S2) for _ in range(ns)] 
+#Simulations of two player games ns-times and games with up to Sn strategies for player n
+def simulation_worker1(params):
+    # Unpack S1, S2, the (run seed, game number) and the number of block processes
+    S1, S2, seed, block_processes = params
 
-    with Pool(num_processes) as pool:
-        results = pool.map(simulation_worker1, sim_params)
+    random_payoffs = generate_payoffs([S1, S2], game_rng(*seed))
+    random_game = create_n_player_game(random_payoffs)
 
-        # Store results in the dictionary
-        for i, result in enumerate(results):
-            game_key = 'Game' + str((S1, S2, ns))
-            if game_key not in list_game:
-                list_game[game_key] = []
-            list_game[game_key].append(result)
+    return solve_game(random_game, block_processes)
 
-            n_ne += result  # Update total NE
+#Records of the games of a batch, from the same parameters as simulation_worker1
+def simulation_batch1(params_list):
+    games = [create_n_player_game(generate_payoffs([S1, S2], game_rng(*seed))) for S1, S2, seed, _ in params_list]
+    return solve_batch(games)
 
-            toc = time.perf_counter()
-            print("Seconds: ", np.round(toc - tic, 1), 
-                  "Simulations:", i + 1,
-                  "Mean SO (Total):", n_ne / (i + 1)) 
+def simulations(ns, S1, S2, num_processes=None, chunksize=1,
+                run_seed=0, store_path=None, resume=False, block_processes=None, batch_size=None, overwrite=False):
+    # Generate parameters for worker processes
+    sim_params = lambda seed: (S1, S2, seed, block_processes)
 
-    return list_game
+    return run_simulations(simulation_worker1, sim_params, 'Game' + str((S1, S2, ns)), ns, num_processes, chunksize,
+                           run_seed, store_path, resume, in_process=block_processes is not None,
+                           batch_worker=simulation_batch1, batch_size=batch_size, overwrite=overwrite)
 
 # Simulations of games with m strategies for each of the n players for ns-times
 
-def simulation_worker2(n, m):  # Function to be run in each process
+def simulation_worker2(n, m, seed=None, block_processes=None):  # Function to be run in each process
     strats = m * np.ones(n).astype('int16')
 
-    current_ne = 0
-    random_payoffs = generate_payoffs(strats)
+    random_payoffs = generate_payoffs(strats, np.random if seed is None else game_rng(*seed))
     random_game = create_n_player_game(random_payoffs)
 
-    for mgb in min_game_blocks(random_game):
-        current_ne += len(mgb[1])
-
-    return current_ne
-
-def simulations2(ns, n, m, num_processes=4):  # Add optional num_processes
-    list_game =  {}
-    n_ne = 0
-
-    tic = time.perf_counter()
+    return solve_game(random_game, block_processes)
+
+def simulation_worker2_params(params):
+    return simulation_worker2(*params)
+
+#Records of the games of a batch, from the same parameters as simulation_worker2
+def simulation_batch2(params_list):
+    games = []
+    for n, m, seed, _ in params_list:
+        strats = m * np.ones(n).astype('int16')
+        games.append(create_n_player_game(generate_payoffs(strats, np.random if seed is None else game_rng(*seed))))
+    return solve_batch(games)
+
+def simulations2(ns, n, m, num_processes=None, chunksize=1,
+                 run_seed=0, store_path=None, resume=False, block_processes=None, batch_size=None,
+                 overwrite=False):  # Add optional num_processes
+    sim_params = lambda seed: (n, m, seed, block_processes)
+
+    return run_simulations(simulation_worker2_params, sim_params, 'Game' + str((n, m, ns)), ns, num_processes, chunksize,
+                           run_seed, store_path, resume, in_process=block_processes is not None,
+                           batch_worker=simulation_batch2, batch_size=batch_size, overwrite=overwrite)
+
+# Stream the results of a worker over the parameters as they complete, in any order. Parameters are dispatched
+# in chunks, from this thread, and at most max_in_flight of them are handed to the pool before their results are
+# consumed, so nothing waits in the pool's own threads. When a worker raises or the consumer stops, the chunks
+# still running are waited for before the pool is terminated, since terminating a worker while it sends a result
+# can leave the pool unable to shut down.
+def stream_results(worker, params, num_processes=None, chunksize=1, max_in_flight=None):
+    num_processes = num_processes or cpu_count()
+    max_in_flight = max(max_in_flight or num_processes * chunksize * 4, chunksize)
+    params = iter(params)
+    chunks = iter(lambda: list(islice(params, chunksize)), [])
+    finished = SimpleQueue()
 
     with Pool(num_processes) as pool:
-        # More granular control over work distribution 
-        work_per_process = ns // num_processes
-        leftover_work = ns % num_processes
-        work_assignments = [work_per_process] * num_processes
-        for i in range(leftover_work):
-            work_assignments[i] += 1
+        def submit(chunk):
+            pool.apply_async(run_chunk, (worker, chunk), callback=lambda results: finished.put((True, results)),
+                             error_callback=lambda error: finished.put((False, error)))
+
+        pending = 0
+        try:
+            for chunk in islice(chunks, max_in_flight // chunksize):
+                submit(chunk)
+                pending += 1
+            while pending:
+                ok, results = finished.get()
+                pending -= 1
+                if not ok:
+                    raise results
+                for chunk in islice(chunks, 1):
+                    submit(chunk)
+                    pending += 1
+                yield from results
+        except (Exception, GeneratorExit):
+            for _ in range(pending):
+                finished.get()
+            raise
+
+#Results of a worker over a chunk of parameters, in a worker process
+def run_chunk(worker, chunk):
+    return [worker(param) for param in chunk]
+
+#Run a game in a worker process and return it with its number
+def run_game(task):
+    worker, game_number, params = task
+    return game_number, worker(params)
+
+#Run a batch of games in a worker process and return them with their numbers
+def run_batch(task):
+    batch_worker, game_numbers, params_list = task
+    return list(zip(game_numbers, batch_worker(params_list)))
+
+#Run games 0, ..., ns-1 of a run, each with the payoffs drawn from game_rng(run_seed, game number). The workers
+#return a game_record per game. With a store_path every record is appended to a ResultsStore as soon as the game
+#completes, and with resume the games already in the store for this run seed are not run again; a store that holds
+#results is only started over with overwrite. With in_process
+#the games are run one at a time in this process, for workers that solve the blocks of each game in their own
+#process pool. With a batch_size, the games are handed to batch_worker in batches of that many, which are
+#screened together by batch_min_game_blocks.
+def run_simulations(worker, sim_params, game_key, ns, num_processes=None, chunksize=1,
+                    run_seed=0, store_path=None, resume=False, in_process=False, batch_worker=None, batch_size=None,
+                    overwrite=False):
+    store = ResultsStore(store_path, resume, overwrite) if store_path else None
+    done = store.completed(run_seed) if store and resume else {}
+    done = {game: int(row['ne']) for game, row in done.items() if game < ns}
+
+    list_game = {game_key: list(done.values())}
+    n_ne = sum(done.values())  # Track total NE across all simulations
+    pending = (game for game in range(ns) if game not in done)
 
-        results = pool.starmap(simulation_worker2, [(n, m) for _ in range(ns)])
+    tic = time.perf_counter()
 
-        for i, result in enumerate(results):
-            game_key = 'Game' + str((n, m, ns))
-            if game_key not in list_game:
-                list_game[game_key] = []
-            list_game[game_key].append(result)
+    if batch_size:
+        batches = iter(lambda: list(islice(pending, batch_size)), [])
+        tasks = ((batch_worker, games, [sim_params((run_seed, game)) for game in games]) for games in batches)
+        results = chain.from_iterable(stream_results(run_batch, tasks, num_processes, chunksize))
+    else:
+        tasks = ((worker, game, sim_params((run_seed, game))) for game in pending)
+        results = map(run_game, tasks) if in_process else stream_results(run_game, tasks, num_processes, chunksize)
+    for i, (game, record) in enumerate(results, start=len(done)):
+        if store:
+            store.append({'run_seed': run_seed, 'game': game, **record})
+        list_game[game_key].append(record['ne'])
 
-            n_ne += result  # Update total NE
+        n_ne += record['ne']  # Update total NE
 
-            toc = time.perf_counter()
-            print("Seconds: ", np.round(toc - tic, 1), 
-                  "Simulations:", i + 1,
-                  "Mean SO (Total):", n_ne / (i + 1)) 
+        toc = time.perf_counter()
+        print("Seconds: ", np.round(toc - tic, 1), 
+              "Simulations:", i + 1,
+              "Mean SO (Total):", n_ne / (i + 1), flush=True) 
 
     return list_game
 
+#Results store of a shard of a sharded sweep, the same for every worker that claims the shard. gt_aggregate reads
+#files named shard_* with duplicate games dropped.
+def shard_store_path(output_dir, shard):
+    return os.path.join(output_dir, 'shard_{sim_type}_{S1}_{S2}_{run_seed}_{first_game}.csv'.format(**shard))
+
+#Worker of a sharded sweep: claim shards from the WorkQueue at queue_path until none are left, and store the games
+#of each shard in its own ResultsStore in output_dir. The lease is renewed by a heartbeat thread while the games run,
+#so a game may take longer than the lease. A shard whose lease was lost to another worker is left to that worker,
+#and the game that was running when it was lost is not stored. For sim2 shards S1 and S2 are the number of players
+#and of strategies, as in simulations2.
+def run_shard_worker(queue_path, output_dir, lease_seconds=600, poll_seconds=5, owner=None):
+    queue = WorkQueue(queue_path)
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    while True:
+        shard = queue.claim(owner, lease_seconds)
+        if shard is None:
+            status = queue.status()
+            if status['pending'] == 0 and status['leased'] == 0:
+                break
+            # Shards leased by other workers are claimed when their lease expires
+            time.sleep(poll_seconds)
+            continue
+
+        worker = simulation_worker1 if shard['sim_type'] == 'sim1' else simulation_worker2_params
+        sim_params = lambda seed: (shard['S1'], shard['S2'], seed, None)
+
+        store = ResultsStore(shard_store_path(output_dir, shard), resume=True)
+        done = store.completed(shard['run_seed'])
+        stop, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=hold_lease, args=(queue_path, shard['id'], owner, lease_seconds, stop, lost),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            for game in range(shard['first_game'], shard['first_game'] + shard['num_games']):
+                if game in done:
+                    continue
+                record = worker(sim_params((shard['run_seed'], game)))
+                if lost.is_set():
+                    break
+                store.append({'run_seed': shard['run_seed'], 'game': game, **record})
+            else:
+                queue.complete(shard['id'], owner)
+                print("Shard", shard['id'], "done:", queue.status(), flush=True)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    queue.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run simulations with configurable parameters.')
@@ -123,28 +269,73 @@ if __name__ == "__main__":
     parser.add_argument('-t', '--sim_type', choices=['sim1', 'sim2'], default='sim1',
                         help='Choose between simulations or simulations2 function.')
 
-    args = parser.parse_args()
     parser.add_argument('-o', '--output_dir', default='.',
                         help='Directory to save the results CSV file (default: current directory)')
+    parser.add_argument('-w', '--workers', type=int, default=cpu_count(),
+                        help='Number of worker processes (default: number of cores).')
+    parser.add_argument('-c', '--chunksize', type=int, default=1,
+                        help='Number of games handed to a worker at a time.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the run; the payoffs of each game are drawn from this seed and the game number.')
+    parser.add_argument('--block_workers', type=int, default=None,
+                        help='Run the games one at a time and solve the blocks of each game with this many processes, '
+                             'which read the payoffs from shared memory (for large games).')
+    parser.add_argument('-b', '--batch_size', type=int, default=None,
+                        help='Solve the games in batches of this many, screening the cheap stages of a whole batch '
+                             'at once (for many small games).')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip the games of this seed that are already in the results store of the output directory.')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Start the results store of the output directory over, discarding the games it holds.')
+    parser.add_argument('--queue', default=None,
+                        help='SQLite work queue of a sharded sweep, on a filesystem shared by the workers.')
+    parser.add_argument('--role', choices=['coordinator', 'worker', 'status'], default='worker',
+                        help='With --queue: add the shards of a sweep, work on shards, or print the shard counts.')
+    parser.add_argument('--shapes', nargs='+', default=None,
+                        help='Shapes of a sweep as S1xS2 (sim1) or NxM (sim2), e.g. 2x3 3x3 (default: -s1 x -s2).')
+    parser.add_argument('--seeds', type=int, nargs='+', default=None,
+                        help='Run seeds of a sweep (default: --seed).')
+    parser.add_argument('--shard_size', type=int, default=100,
+                        help='Number of games in a shard of a sweep.')
+    parser.add_argument('--lease', type=float, default=600,
+                        help='Seconds a worker holds a shard without renewing; an abandoned shard is re-claimed after this.')
 
     args = parser.parse_args()
 
+    # Sharded sweep: the coordinator fills the queue and any number of workers, on any host sharing the
+    # output directory and the queue, store the games of their shards there
+    if args.queue:
+        if args.role == 'coordinator':
+            shapes = [tuple(int(num) for num in shape.split('x')) for shape in args.shapes or [f"{args.S1}x{args.S2}"]]
+            WorkQueue(args.queue).add_shards(args.sim_type, shapes, args.seeds or [args.seed], args.num_simulations,
+                                             args.shard_size)
+        elif args.role == 'worker':
+            run_shard_worker(args.queue, args.output_dir, args.lease)
+        print(WorkQueue(args.queue).status())
+        raise SystemExit
+
     # ... (Simulation execution) ...
     if args.sim_type == 'sim1':
         simulation_func = simulations
     else:
         simulation_func = simulations2
 
+    # Create the output directory if it doesn't exist
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Results of the individual games are appended to this file as they complete
+    store_filepath = os.path.join(args.output_dir, f"games_{args.sim_type}_{args.S1}_{args.S2}.csv")
+
     # Run simulations with chosen parameters
-    results = simulation_func(args.num_simulations, args.S1, args.S2)
+    results = simulation_func(args.num_simulations, args.S1, args.S2, num_processes=args.workers,
+                              chunksize=args.chunksize, run_seed=args.seed, store_path=store_filepath, resume=args.resume,
+                              block_processes=args.block_workers, batch_size=args.batch_size,
+                              overwrite=args.overwrite)
     
     # --- Results Saving ---
     output_filename = f"results_{args.S1}_{args.S2}.csv"
     output_filepath = os.path.join(args.output_dir, output_filename)
 
-    # Create the output directory if it doesn't exist
-    os.makedirs(args.output_dir, exist_ok=True)
-
     # Assuming results is a dictionary with 'Game...' keys and lists of values
     with open(output_filepath, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
@@ -0,0 +1,125 @@
+import contextlib
+import os
+import sqlite3
+import time
+
+class WorkQueue:
+    """
+    A queue of simulation shards in a SQLite file, shared by worker processes on one or more hosts.
+
+    ...
+
+    A shard is a range of game numbers of one run seed and one game shape. A worker claims a shard with
+    a lease, renews the lease while it works and marks the shard done when all its games are stored.
+    A shard whose lease has expired, because its worker died or lost the filesystem, can be claimed by
+    another worker, which skips the games already stored. All updates are SQLite transactions with the
+    default rollback journal, which relies only on file locks; write-ahead logging is not used because it
+    needs memory shared between the processes of one host. The file must be on a filesystem whose POSIX
+    locks work across all the hosts: a local disk, or a network filesystem with working lock support
+    (many NFS setups do not provide it, and SQLite cannot detect that).
+
+    Attributes
+    ----------
+    path : str
+        path of the SQLite file
+
+    Methods
+    -------
+    add_shards(sim_type, shapes, seeds, ns, shard_size)
+        splits ns games of every shape and seed into shards; shards that exist already are kept
+    claim(owner, lease_seconds)
+        leases the next pending or abandoned shard to owner and returns it, or returns None
+    renew(shard_id, owner, lease_seconds)
+        extends the lease of a shard; returns False if owner no longer holds it
+    complete(shard_id, owner)
+        marks a leased shard as done
+    status()
+        returns the number of shards in each state
+    """
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        # Write-ahead logging does not work across hosts, so the queue keeps the rollback journal
+        self.connection.execute('PRAGMA journal_mode=DELETE')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS shards '
+                                '(id INTEGER PRIMARY KEY, sim_type TEXT, S1 INTEGER, S2 INTEGER, run_seed INTEGER, '
+                                'first_game INTEGER, num_games INTEGER, status TEXT, owner TEXT, '
+                                'lease_until REAL, attempts INTEGER, '
+                                'UNIQUE (sim_type, S1, S2, run_seed, first_game))')
+
+    def add_shards(self, sim_type, shapes, seeds, ns, shard_size):
+        with self.transaction():
+            for S1, S2 in shapes:
+                for run_seed in seeds:
+                    for first_game in range(0, ns, shard_size):
+                        self.connection.execute(
+                            'INSERT OR IGNORE INTO shards VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, 0)',
+                            (sim_type, S1, S2, run_seed, first_game, min(shard_size, ns - first_game), 'pending'))
+
+    def claim(self, owner, lease_seconds):
+        now = time.time()
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT * FROM shards WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE shards SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now + lease_seconds, row['id']))
+        return dict(row)
+
+    def renew(self, shard_id, owner, lease_seconds):
+        with self.transaction():
+            cursor = self.connection.execute(
+                "UPDATE shards SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                (time.time() + lease_seconds, shard_id, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id, owner):
+        with self.transaction():
+            cursor = self.connection.execute(
+                "UPDATE shards SET status = 'done', lease_until = NULL WHERE id = ? AND owner = ? AND status = 'leased'",
+                (shard_id, owner))
+        return cursor.rowcount == 1
+
+    def status(self):
+        counts = {'pending': 0, 'leased': 0, 'done': 0}
+        for row in self.connection.execute('SELECT status, COUNT(*) FROM shards GROUP BY status'):
+            counts[row[0]] = row[1]
+        return counts
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot both see a shard as claimable
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def close(self):
+        self.connection.close()
+
+def hold_lease(path, shard_id, owner, lease_seconds, stop, lost):
+    """ Renew the lease of a shard every third of the lease until stop is set, from a connection of its own so
+    that it can run in a thread while the games of the shard are solved. Sets lost and returns when another
+    worker has taken the shard over."""
+
+    queue = WorkQueue(path)
+    try:
+        while not stop.wait(lease_seconds / 3):
+            try:
+                if not queue.renew(shard_id, owner, lease_seconds):
+                    lost.set()
+                    return
+            except sqlite3.OperationalError:
+                # The queue stayed locked for the whole timeout; try again at the next renewal
+                continue
+    finally:
+        queue.close()
@@ -0,0 +1,112 @@
+import numpy as np
+from src.models.gt_block_generator import potential_support_pairs
+from src.models.gt_min_gb_generic import add_solved_block, ne_index, pure_blocks, solve_block, support_size
+from src.models.gt_support_lattice import SupportLattice
+from src.models.gt_utils import pure_profiles
+
+# Minimal game blocks of many games of the same shape at once. The payoff tensors of the games are stacked
+# into one (K, num_players, *num_strategies) array and every support profile is handled for all games that
+# have not pruned it in one pass: pure-strategy equilibria, admissibility of the blocks and, in two-player
+# games, the linear zeros of the blocks are computed for the whole batch. Only the blocks of games with
+# three or more players that survive these stages are solved one by one with the homotopy.
+
+def batch_tensors(games):
+    return np.stack([game.tensor for game in games])
+
+def batch_pure_nash_mask(tensors):
+    """ The pure_nash_mask of every game in a batch of payoff tensors, shape (K, *num_strategies)"""
+
+    mask = np.ones((tensors.shape[0], *tensors.shape[2:]), dtype=bool)
+    for p in range(tensors.shape[1]):
+        payoff = tensors[:, p]
+        mask &= payoff >= payoff.max(axis=1 + p, keepdims=True)
+    return mask
+
+def batch_block(tensors, games, indices):
+    """ The payoff tensors of the block of a support profile in the given games of the batch"""
+
+    return tensors[np.ix_(games, range(tensors.shape[1]), *indices)]
+
+def batch_admissible(blocks):
+    """ For a batch of block tensors, whether each block is admissible (see admissible_block)"""
+
+    K, n = blocks.shape[:2]
+    admissible = np.ones(K, dtype=bool)
+    for p in range(n):
+        num = blocks.shape[2 + p]
+        flat = np.moveaxis(blocks[:, p], 1 + p, 1).reshape(K, num, -1)
+        weakly_below = np.all(flat[:, :, np.newaxis, :] <= flat[:, np.newaxis, :, :], axis=3)
+        weakly_below[:, np.arange(num), np.arange(num)] = False
+        admissible &= ~weakly_below.any(axis=(1, 2))
+    return admissible
+
+def batch_bimatrix_roots(blocks, tol):
+    """ The zeros of bimatrix_solver for a batch of two-player block tensors. Returns a mask of the blocks
+    with a zero and the strategies x, y of the two players."""
+
+    K, _, k1, k2 = blocks.shape
+    if k1 != k2:
+        return np.zeros(K, dtype=bool), None, None
+    # The payoff arrays of the two players with their own strategies first, as in Game.payoffs
+    matrices = []
+    for payoff in (blocks[:, 0], np.swapaxes(blocks[:, 1], 1, 2)):
+        matrices.append(np.concatenate([payoff[:, :-1] - payoff[:, -1:], np.ones((K, 1, k1))], axis=1))
+    matrices = np.stack(matrices, axis=1)
+    rhs = np.zeros((K, 2, k1, 1))
+    rhs[:, :, -1] = 1
+    try:
+        solutions = np.linalg.solve(matrices, rhs)[..., 0]
+    except np.linalg.LinAlgError:
+        # A singular block has no zero; solve the others one by one
+        solutions = np.full((K, 2, k1), np.nan)
+        for k in range(K):
+            try:
+                solutions[k] = np.linalg.solve(matrices[k], rhs[k])[..., 0]
+            except np.linalg.LinAlgError:
+                pass
+    y, x = solutions[:, 0], solutions[:, 1]
+    found = np.all(np.isfinite(solutions), axis=(1, 2)) & np.all(x >= tol, axis=1) & np.all(y >= tol, axis=1)
+    return found, x, y
+
+def batch_min_game_blocks(games, cache=None):
+    """Return the minimal game blocks of each of a list of games with the same numbers of strategies, as
+    list(min_game_blocks(game)) would for each game."""
+
+    K = len(games)
+    n = games[0].num_players
+    tensors = batch_tensors(games)
+
+    min_gbs = [SupportLattice(games[0].num_strategies) for _ in range(K)]
+    bg_ne_index = [SupportLattice(games[0].num_strategies) for _ in range(K)]
+    results = [[] for _ in range(K)]
+
+    def add(k, indices, nei):
+        mgb = add_solved_block(min_gbs[k], bg_ne_index[k], indices, nei)
+        if mgb is not None:
+            results[k].append(mgb)
+
+    pure = batch_pure_nash_mask(tensors)
+    for k, game in enumerate(games):
+        for indices, nei in pure_blocks(game, pure_profiles(pure[k])):
+            add(k, indices, nei)
+
+    for indices in potential_support_pairs(games[0]):
+        if support_size(indices) == n:
+            continue
+        active = np.array([k for k in range(K) if not min_gbs[k].any_below(indices)], dtype=int)
+        if not len(active):
+            continue
+        blocks = batch_block(tensors, active, indices)
+        admissible = batch_admissible(blocks)
+        # Blocks that are not admissible are skipped by the search, as solve_block returns None for them
+
+        if n == 2:
+            found, x, y = batch_bimatrix_roots(blocks[admissible], 1e-6)
+            for i, k in enumerate(active[admissible]):
+                pot_sols = [[x[i], y[i]]] if found[i] else []
+                add(k, indices, ne_index(pot_sols, indices, games[k]))
+        else:
+            for k in active[admissible]:
+                add(k, indices, solve_block(games[k], indices, cache))
+
+    return results
@@ -1,4 +1,5 @@
 from itertools import chain, combinations, product
+import numpy as np
 
 # Functions for generating block games in right order
 
@@ -6,28 +7,60 @@ def powerset(iterable):
     s = list(iterable)
     return chain.from_iterable(combinations(s, r) for r in range(1, len(s) + 1))
 
+# Subsets of range(num) with a size in sizes, in lexicographic order of the tuples
+def lex_subsets(num, sizes):
+    max_size = max(sizes)
+
+    def extend(prefix, start):
+        if len(prefix) in sizes:
+            yield tuple(prefix)
+        if len(prefix) < max_size:
+            for s in range(start, num):
+                prefix.append(s)
+                yield from extend(prefix, s + 1)
+                prefix.pop()
+
+    return extend([], 0)
+
+# Support profiles with the given support sizes, in lexicographic order of the profiles
+def ordered_supports(num_strategies, size_profiles, prefix=()):
+    p = len(prefix)
+    if p == len(num_strategies):
+        yield prefix
+        return
+    by_size = {}
+    for sizes in size_profiles:
+        by_size.setdefault(sizes[p], []).append(sizes)
+    for support in lex_subsets(num_strategies[p], set(by_size)):
+        yield from ordered_supports(num_strategies, by_size[len(support)], prefix + (support,))
+
+# Support profiles ordered by total size, then by the difference between the largest and smallest support,
+# then lexicographically. Only one class of support sizes is generated at a time, so memory stays bounded
+# by the number of size profiles rather than the number of support profiles.
 def potential_support_pairs(game):
     num_strategies = game.num_strategies
-    support_sets = [sorted(list(powerset(range(num))), key=lambda x: (len(x), x)) for num in num_strategies]
-
-    combined_supports_list = list(product(*support_sets))
-    sorted_combined_supports_list = sorted(combined_supports_list, key=lambda x: (sum(len(y) for y in x), max(len(y) for y in x) - min(len(y) for y in x), x))
+    size_classes = {}
+    for sizes in product(*[range(1, num + 1) for num in num_strategies]):
+        size_classes.setdefault((sum(sizes), max(sizes) - min(sizes)), []).append(sizes)
 
-    for sorted_combined_supports in sorted_combined_supports_list:
-        yield sorted_combined_supports
+    for size_class in sorted(size_classes):
+        yield from ordered_supports(num_strategies, size_classes[size_class])
         
-# Recursive function to get payoffs of block game given indices of the players' strategies
+# Index of a support for one axis of a payoff array. A contiguous run of strategies is a slice,
+# so the block is a view of the parent array; any other support is gathered with one fancy index.
+def axis_index(index):
+    index = tuple(index)
+    if index == tuple(range(index[0], index[0] + len(index))):
+        return slice(index[0], index[0] + len(index))
+    return index
+
+# Payoffs of block game given indices of the players' strategies (own strategies first)
 def payoff_player(payoff, indices):
-    indices = list(indices)
-    index = indices.pop(0)
-    t_payoff = [payoff[i] for i in index]
-    for i, pay in enumerate(t_payoff):
-        if len(indices)>0:
-            pay_1 = payoff_player(pay, indices)
-            t_payoff[i] = pay_1
-        else:
-            t_payoff[i] = pay
-    return t_payoff
+    payoff = np.asarray(payoff)
+    axes = [axis_index(index) for index in indices]
+    if all(isinstance(axis, slice) for axis in axes):
+        return payoff[tuple(axes)]
+    return payoff[np.ix_(*indices)]
 
 def block_game(payoffs, indices):
     block = []
@@ -37,4 +70,4 @@ def block_game(payoffs, indices):
         indexes = tuple([indices[p], *index])
         block_n = payoff_player(payoff, indexes)
         block.append(block_n)
-    return block
\ No newline at end of file
+    return block
@@ -0,0 +1,117 @@
+import time
+
+class Budget:
+    """
+    Limits on a run of min_game_blocks, and a record of how far the run got.
+
+    ...
+
+    Support profiles are solved in tiers of increasing total support size. When the time or the number
+    of solved blocks runs out, the run stops before the next block and the tiers below the one it was
+    working on are reported as covered. Every minimal block found before the stop is a true minimal
+    block of the game: all blocks nested in it belong to earlier tiers. The deadline is checked between
+    blocks in the serial path, and also while waiting for the workers in the parallel path. Profiles
+    skipped by the per-player limit leave their tier, and every tier after it, uncovered, although the
+    run goes on through the profiles within the limit.
+
+    Attributes
+    ----------
+    max_support_size : int
+        largest total support size (summed over players) to solve, or None
+    max_player_support_size : int
+        largest support size of any one player to solve, or None; larger profiles are skipped
+    deadline : float
+        wall-clock seconds allowed from the start of the run, or None
+    max_blocks : int
+        largest number of blocks to solve, or None
+    blocks_solved : int
+        number of blocks solved so far
+    covered_size : int
+        every tier up to this total support size has been fully covered (0 before the first tier)
+    skipped : int
+        number of support profiles skipped by the per-player limit
+    exhausted : str
+        the budget that stopped the run ('deadline', 'max_blocks' or 'max_support_size'), or
+        'max_player_support_size' when profiles were skipped but the run went on; None otherwise
+
+    Methods
+    -------
+    start()
+        starts the clock; called by min_game_blocks
+    remaining_time()
+        returns the seconds left before the deadline, or None without a deadline
+    cover(size)
+        records that a tier has been gone through, which covers it if no profile has been skipped
+    as_dict()
+        returns the limits and the progress as a dict
+    """
+    def __init__(self, max_support_size=None, max_player_support_size=None, deadline=None, max_blocks=None):
+        self.max_support_size = max_support_size
+        self.max_player_support_size = max_player_support_size
+        self.deadline = deadline
+        self.max_blocks = max_blocks
+        self.blocks_solved = 0
+        self.covered_size = 0
+        self.skipped = 0
+        self.exhausted = None
+        self._end = None
+
+    def start(self):
+        self.blocks_solved = 0
+        self.covered_size = 0
+        self.skipped = 0
+        self.exhausted = None
+        self._end = None if self.deadline is None else time.monotonic() + self.deadline
+
+    @property
+    def complete(self):
+        """ Whether the run went through every support profile allowed by the size limits"""
+        return self.exhausted in (None, 'max_support_size', 'max_player_support_size')
+
+    def remaining_time(self):
+        if self._end is None:
+            return None
+        return max(self._end - time.monotonic(), 0.0)
+
+    def within_size(self, size):
+        """ Whether a tier of this total support size is to be solved; records the stop if not"""
+        if self.max_support_size is not None and size > self.max_support_size:
+            self.exhausted = 'max_support_size'
+            return False
+        return True
+
+    def allows(self, indices):
+        """ Whether the support profile is within the per-player size limit; records the skip if not"""
+        if self.max_player_support_size is None or max(len(index) for index in indices) <= self.max_player_support_size:
+            return True
+        self.skipped += 1
+        if self.exhausted is None:
+            self.exhausted = 'max_player_support_size'
+        return False
+
+    def cover(self, size):
+        if not self.skipped:
+            self.covered_size = size
+
+    def remaining_blocks(self):
+        if self.max_blocks is None:
+            return None
+        return max(self.max_blocks - self.blocks_solved, 0)
+
+    def spent(self):
+        """ Whether the time or the number of blocks has run out; records which one"""
+        if self.max_blocks is not None and self.blocks_solved >= self.max_blocks:
+            self.exhausted = 'max_blocks'
+        elif self._end is not None and time.monotonic() >= self._end:
+            self.exhausted = 'deadline'
+        return self.exhausted not in (None, 'max_player_support_size')
+
+    def as_dict(self):
+        return {'max_support_size': self.max_support_size,
+                'max_player_support_size': self.max_player_support_size,
+                'deadline': self.deadline,
+                'max_blocks': self.max_blocks,
+                'blocks_solved': self.blocks_solved,
+                'covered_size': self.covered_size,
+                'skipped': self.skipped,
+                'exhausted': self.exhausted}
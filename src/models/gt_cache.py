@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import numpy as np
+
+# Bump when a change to the solvers changes what they return, so that old entries are not reused
+CACHE_VERSION = 2
+
+class EquilibriumCache:
+    """
+    A content-addressed on-disk cache of solver results, stored in a local SQLite file.
+
+    ...
+
+    Entries are keyed by a hash of the kind of result, the payoff arrays and the solver tolerances,
+    so the same payoff table gives the same key in every process, notebook or service that shares the
+    file. When the stored values grow beyond max_bytes, the least recently used entries are evicted.
+    The cache can be passed to worker processes: it pickles as its path and reconnects on first use.
+
+    Attributes
+    ----------
+    path : str
+        path of the SQLite file
+    max_bytes : int
+        size limit of the stored (pickled) values
+    hits : int
+        number of lookups answered from the cache in this process
+    misses : int
+        number of lookups not found in the cache in this process
+
+    Methods
+    -------
+    key(kind, payoffs, **params)
+        returns the key of a result for the payoff arrays and solver parameters
+    get(key)
+        returns the stored value, or None
+    put(key, value)
+        stores a value and evicts least recently used entries beyond max_bytes
+    """
+    def __init__(self, path, max_bytes=256 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_bytes'])
+
+    @property
+    def connection(self):
+        # A connection inherited by a forked worker process must not be used there
+        if self._connection is not None and self._pid != os.getpid():
+            self._connection = None
+        if self._connection is None:
+            self._pid = os.getpid()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS entries '
+                                     '(key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL)')
+            self._connection.commit()
+        return self._connection
+
+    def key(self, kind, payoffs, **params):
+        digest = hashlib.sha256()
+        digest.update(repr((CACHE_VERSION, kind, sorted(params.items()))).encode())
+        for payoff in payoffs:
+            payoff = np.ascontiguousarray(payoff, dtype=np.float64)
+            digest.update(repr(payoff.shape).encode())
+            digest.update(payoff.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        row = self.connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self.connection:
+            self.connection.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                    (key, blob, len(blob), time.time()))
+            self.evict()
+
+    def evict(self):
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.connection.execute('SELECT key, size FROM entries ORDER BY last_used').fetchall():
+            self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM entries')
@@ -1,3 +1,4 @@
+import numpy as np
 import sympy as sp
 
 class Game:
@@ -13,12 +14,15 @@ class Game:
     num_strategies : list
         a list of the number of strategies for each player
     payoffs : list
-        payoff matrix of the game of the form [player][strategy_player][strategy_player1, strategy_player2, ...] 
+        payoff arrays of the game, one numpy.ndarray per player, of the form [player][strategy_player][strategy_player1, strategy_player2, ...]
         (if player is, e.g. player 1, then strategy_player is the strategy of player 1 and strategy_player1 is the strategy of player 2)
+    tensor : numpy.ndarray
+        payoffs of all players as one array of shape (num_players, *num_strategies), where tensor[player][s1, s2, ...]
+        is the payoff to player when player i plays strategy si
     indices : list
         indices of the strategies for each player in the payoff matrix
-    probas : list
-        list of the probabilities of each strategy for each player
+    proba : list
+        sympy symbols of the probabilities of each strategy for each player, created on first use
 
     Methods
     -------
@@ -27,33 +31,42 @@ class Game:
     get_strategy_indices(payoffs)
         returns the indices of the strategies for each player
     """
-    def __init__(self, num_players, num_strategies, payoffs, indices, probas):
+    def __init__(self, num_players, num_strategies, payoffs, indices, probas=None):
         self.num_players = num_players
         self.num_strategies = num_strategies
-        self.payoffs = payoffs
+        self.payoffs = [np.asarray(payoff, dtype=np.float64) for payoff in payoffs]
         self.index = indices
-        self.proba = probas
+        self._proba = probas
+        self._tensor = None
 
-""" A function that creates a game with n players and variable strategies for each player. Uses the get_strategy_indices function to get the indices of the strategies for each player."""
+    @property
+    def proba(self):
+        """ The probability symbols, created on first use: only the symbolic equations need them, so the
+        block games of the numeric solvers never build them."""
+        if self._proba is None:
+            self._proba = [[sp.Symbol(f'p{i+1}{j+1}') for j in range(num)] for i, num in enumerate(self.num_strategies)]
+        return self._proba
+
+    @property
+    def tensor(self):
+        """ The payoffs with the strategy axes in player order, built once on first use."""
+        if self._tensor is None:
+            self._tensor = np.stack([np.moveaxis(payoff, 0, p) for p, payoff in enumerate(self.payoffs)])
+        return self._tensor
+
+""" A function that creates a game with n players and variable strategies for each player. Uses the get_strategy_indices function to get the indices of the strategies for each player.
+Payoffs can be given as nested lists or as numpy arrays; they are stored as one array per player."""
 
 
 def create_n_player_game(payoffs):
+    payoffs = [np.asarray(payoff, dtype=np.float64) for payoff in payoffs]
     num_players = len(payoffs)
-    num_strategies = [len(payoffs[i]) for i in range(num_players)]
+    num_strategies = [payoffs[i].shape[0] for i in range(num_players)]
     indices = get_strategy_indices(payoffs)
-    probas = [[sp.Symbol(f'p{i+1}{j+1}') for j in range(num_strategies[i])] for i in range(num_players)]
 
-    return Game(num_players, num_strategies, payoffs, indices, probas)
+    return Game(num_players, num_strategies, payoffs, indices)
 
 """ A function that returns the indices of the strategies for each player"""
 
 def get_strategy_indices(payoffs):
-    strategy_indices = []
-
-    for player_payoffs in payoffs:
-        player_strategy_indices = []
-        for i, _ in enumerate(player_payoffs):
-            player_strategy_indices.append(i)
-        strategy_indices.append(tuple(player_strategy_indices))
-
-    return tuple(strategy_indices)
\ No newline at end of file
+    return tuple(tuple(range(len(player_payoffs))) for player_payoffs in payoffs)
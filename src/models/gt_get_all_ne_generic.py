@@ -2,40 +2,57 @@
 from src.models.zero_solver  import zero_solver
 from src.models.gt_block_generator import potential_support_pairs, block_game
 from src.models.gt_game_class import create_n_player_game
-from src.models.gt_utils import stra_em, is_strategy_better, is_strategy_strictly_dominated
+from src.models.gt_utils import stra_em, profitable_deviations, admissible_block, pure_equilibria
+import numpy as np
+from src.models import gt_instrumentation as instrumentation
 
 # Nash equilibrium solver
 
-def ne_solver(game): #, index = False
+def ne_solver(game, cache=None): #, index = False
+    if cache is not None:
+        key = cache.key('ne_solver', game.payoffs, tol=1e-6)
+        result = cache.get(key)
+        if result is None:
+            result = search_ne(game, cache)
+            cache.put(key, result)
+        else:
+            instrumentation.count('game_cache_hits')
+        return result
+
+    return search_ne(game)
+
+def search_ne(game, cache=None):
     result = []
 
+    # Pure-strategy equilibria are found in one pass instead of solving each pure profile as a block
+    with instrumentation.timer('pure_equilibria'):
+        for indices in pure_equilibria(game):
+            result.append(stra_em([np.ones(1)] * game.num_players, indices, game.index))
+    instrumentation.count('pure_equilibria', len(result))
+
     for indices in potential_support_pairs(game):
-        block = block_game(game.payoffs, indices)
-        bg = create_n_player_game(block)
-
-        skip_indices = False
-        for p in range(game.num_players):
-            if skip_indices:
-                break
-            for s in range(bg.num_strategies[p]):
-                if is_strategy_strictly_dominated(bg, p, s):
-                    skip_indices = True
-                    break
+        if all(len(index) == 1 for index in indices):
+            continue
+        instrumentation.count('supports_enumerated')
+        with instrumentation.timer('block_game'):
+            block = block_game(game.payoffs, indices)
+            bg = create_n_player_game(block)
+
+        with instrumentation.timer('admissible_block'):
+            admissible = admissible_block(bg)
+        if not admissible:
+            instrumentation.count('pruned_by_admissible_block')
+            continue
                     
-        skip_eq = False
-        pot_sol = zero_solver(bg, 1e-6)
+        with instrumentation.timer('zero_solver'):
+            pot_sol = zero_solver(bg, 1e-6, cache=cache)
         
-        for sol in pot_sol:
-            m_sp = stra_em(sol, indices, game.index)           
-            for p in range(game.num_players):
-                if skip_eq:
+        with instrumentation.timer('deviations'):
+            for sol in pot_sol:
+                m_sp = stra_em(sol, indices, game.index)           
+                if any(len(deviations) for deviations in profitable_deviations(game, m_sp, indices)):
+                    instrumentation.count('rejected_by_deviation')
                     break
-                for s in set(game.index[p]).difference(set(indices[p])):
-                    if is_strategy_better(game, m_sp, p ,s):
-                        skip_eq = True
-                        break
-            if skip_eq:
-                break
-            result.append(m_sp)
+                result.append(m_sp)
 
     return result
\ No newline at end of file
@@ -2,6 +2,7 @@
 import sympy as sp
 import itertools
 import numpy as np
+from src.models.gt_utils import deviation_gains, expected_payoff_vector, pairwise_expected_payoffs
 
 def rounder(sol, digit):
     return [np.round(np.array(sublist).astype(np.float64), digit) for sublist in sol]
@@ -49,18 +50,30 @@ def calculate_expected_payoff_diff_equations_fj(game):
     return flat_payoff_differences_equations
 
 def calculate_index(game, mix_sp):
-    # Get the flattened payoff difference equations
-    payoff_differences_equations = calculate_expected_payoff_diff_equations_fj(game)
-    
+    """ Index of an equilibrium: the sign of the determinant of the Jacobian of the system in 
+    calculate_expected_payoff_diff_equations_fj at mix_sp, built numerically from the payoff arrays.
+    The row of an unused strategy s of player p only has the diagonal entry u_ps - u_p, so the 
+    determinant is the product of these deviation terms times the determinant on the support."""
+
     n = game.num_players
-    probabilities = [[sp.Symbol(f'p{i+1}{j+1}') for j in range(game.num_strategies[i])] for i in range(n)]
+    mix_sp = [np.asarray(probs, dtype=np.float64) for probs in mix_sp]
+    support = [np.flatnonzero(probs) for probs in mix_sp]
+    gains = deviation_gains(game, mix_sp)
 
-    # Flatten the list of probability variables
-    flat_probabilities = [p for sublist in probabilities for p in sublist]
+    unused_terms = np.prod([np.prod(np.delete(gains[p], support[p])) for p in range(n)])
 
-    # Calculate the Jacobian
-    jacobian_matrix = sp.Matrix(payoff_differences_equations).jacobian(flat_probabilities)
+    jacobian_blocks = []
     for p in range(n):
-        jacobian_matrix = jacobian_matrix.subs([(probabilities[p][i], mix_sp[p][i]) for i in range(game.num_strategies[p])])
-    output = np.array(jacobian_matrix).astype(np.float64)
-    return np.sign((-1)**(sum(game.num_strategies))) * np.sign(np.linalg.det(output))
\ No newline at end of file
+        s_p = support[p]
+        row = []
+        for q in range(n):
+            if q == p:
+                payoff = expected_payoff_vector(game, mix_sp, p)
+                row.append(np.diag(gains[p][s_p]) - np.outer(mix_sp[p][s_p], payoff[s_p]))
+            else:
+                pair_payoff = pairwise_expected_payoffs(game, mix_sp, p, q)
+                diff = pair_payoff[np.ix_(s_p, support[q])] - mix_sp[p] @ pair_payoff[:, support[q]]
+                row.append(mix_sp[p][s_p, np.newaxis] * diff)
+        jacobian_blocks.append(row)
+    output = np.block(jacobian_blocks)
+    return np.sign((-1)**(sum(game.num_strategies))) * np.sign(np.linalg.det(output) * unused_terms)
@@ -0,0 +1,111 @@
+import atexit
+import contextlib
+import json
+import os
+import time
+
+# Stage-level timers and counters for min_game_blocks and ne_solver. Nothing is recorded unless
+# instrumentation is switched on, either for a block of code with `with instrumented() as stats:`
+# or for the whole process with the environment variable GT_INSTRUMENT (set it to a file name
+# ending in .json to have the statistics written there when the process exits).
+
+class Instrumentation:
+    """
+    Counters and accumulated stage timings of a run of the solvers.
+
+    ...
+
+    Attributes
+    ----------
+    counters : dict
+        event counts keyed by name, e.g. supports_enumerated or pruned_by_mgb_check
+    timers : dict
+        [total seconds, number of calls] keyed by stage name
+
+    Methods
+    -------
+    count(name, k=1)
+        adds k to a counter
+    timer(name)
+        context manager adding the time spent in its body to a stage
+    merge(stats)
+        adds the counters and timers of another run (a dict from as_dict)
+    as_dict()
+        returns the counters and timers as plain dicts
+    to_json()
+        returns as_dict() as a JSON string
+    """
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+
+    def count(self, name, k=1):
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.timers.setdefault(name, [0.0, 0])
+            entry[0] += time.perf_counter() - tic
+            entry[1] += 1
+
+    def merge(self, stats):
+        for name, k in stats['counters'].items():
+            self.count(name, k)
+        for name, timing in stats['timers'].items():
+            entry = self.timers.setdefault(name, [0.0, 0])
+            entry[0] += timing['seconds']
+            entry[1] += timing['calls']
+
+    def as_dict(self):
+        return {'counters': dict(self.counters),
+                'timers': {name: {'seconds': seconds, 'calls': calls}
+                           for name, (seconds, calls) in self.timers.items()}}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+_active = None
+_null_timer = contextlib.nullcontext()
+
+def current():
+    """ The active Instrumentation, or None"""
+    return _active
+
+def count(name, k=1):
+    if _active is not None:
+        _active.count(name, k)
+
+def timer(name):
+    if _active is None:
+        return _null_timer
+    return _active.timer(name)
+
+@contextlib.contextmanager
+def instrumented(stats=None):
+    """ Record into stats (a new Instrumentation by default) within the block"""
+    global _active
+    previous = _active
+    _active = Instrumentation() if stats is None else stats
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+def _enable_from_environment():
+    global _active
+    setting = os.environ.get('GT_INSTRUMENT', '')
+    if setting in ('', '0'):
+        return
+    _active = Instrumentation()
+    if setting.endswith('.json'):
+        stats = _active
+        def dump():
+            with open(setting, 'w') as f:
+                f.write(stats.to_json(indent=2))
+        atexit.register(dump)
+
+_enable_from_environment()
@@ -1,8 +1,16 @@
-from src.models.gt_utils import is_strategy_better, stra_em, admissible_block
+from src.models.gt_utils import profitable_deviations, stra_em, admissible_block, pure_equilibria
 from src.models.gt_index_calc import calculate_index, rounder
 from src.models.gt_block_generator import potential_support_pairs, block_game
 from src.models.gt_game_class import create_n_player_game
 from src.models.zero_solver import zero_solver
+from src.models.gt_support_lattice import SupportLattice
+from src.models.gt_budget import Budget
+from src.models.gt_shared_payoffs import SharedPayoffs, attach_game
+from src.models.gt_symmetry import support_orbits
+from src.models import gt_instrumentation as instrumentation
+from itertools import groupby, islice
+import numpy as np
+from multiprocessing import Pool, TimeoutError
 
 # Functions for finding minimal game blocks
 def are_nested_indices(index_set1, index_set2):
@@ -24,55 +32,274 @@ def ne_index(pot_sols, indices, game):
     def det_eq_index(sol):
         m_sp = stra_em(sol, indices, game.index)     
 
-        for p in range(game.num_players):
-
-            for s in set(game.index[p]).difference(set(indices[p])):
-
-                if is_strategy_better(game, m_sp, p ,s):
-                    return []
+        if any(len(deviations) for deviations in profitable_deviations(game, m_sp, indices)):
+            return []
                 
         return rounder(m_sp,3), calculate_index(game,m_sp)
         
     for sol in pot_sols:
         ne_index = det_eq_index(sol)
         if not ne_index:
+            instrumentation.count('rejected_by_deviation')
             continue
+        instrumentation.count('index_computations')
         ne_and_index.append(ne_index)
             
     return ne_and_index
 
-def min_game_blocks(game):
-    
-    min_gbs = tuple()
-    bg_ne_index = []
-        
-    for indices in potential_support_pairs(game):
+def solve_block(game, indices, cache=None):
+    """Solve the block game of a support profile. Returns the equilibria of the game found in the block 
+    with their indices, or None if the block is not admissible."""
 
+    with instrumentation.timer('block_game'):
         block = block_game(game.payoffs, indices)
         bg = create_n_player_game(block)
         
-        if mgb_check(indices, min_gbs):
+    with instrumentation.timer('admissible_block'):
+        admissible = admissible_block(bg)
+    if not admissible:
+        instrumentation.count('pruned_by_admissible_block')
+        return None
+    with instrumentation.timer('zero_solver'):
+        pot_sols = zero_solver(bg, 1e-6, cache=cache)
+    with instrumentation.timer('ne_index'):
+        nei = ne_index(pot_sols, indices, game)
+    return nei
+
+def pure_blocks(game, equilibria=None):
+    """The blocks of the pure-strategy equilibria with their equilibrium and index, as solve_block would 
+    return them, found for the whole tier of pure-strategy profiles at once. Pure profiles that are not 
+    equilibria give an empty block, which has no effect on the search, so they are left out. The equilibria 
+    can be passed in when they have been found already."""
+
+    num_profiles = 1
+    for num in game.num_strategies:
+        num_profiles *= num
+    instrumentation.count('supports_enumerated', num_profiles)
+    if equilibria is None:
+        with instrumentation.timer('pure_equilibria'):
+            equilibria = pure_equilibria(game)
+    instrumentation.count('pure_equilibria', len(equilibria))
+    for indices in equilibria:
+        m_sp = stra_em([np.ones(1)] * game.num_players, indices, game.index)
+        instrumentation.count('index_computations')
+        yield indices, [(rounder(m_sp, 3), calculate_index(game, m_sp))]
+
+# Worker processes of the parallel mode get the game once, when the pool starts, either pickled or as
+# the handle of its payoffs in shared memory
+
+_worker_game = None
+_worker_shm = None
+_worker_cache = None
+_worker_instrumented = False
+
+def _init_block_worker(game, cache, instrumented, shared=None):
+    global _worker_game, _worker_shm, _worker_cache, _worker_instrumented
+    if shared is not None:
+        _worker_shm, game = attach_game(shared)
+    _worker_game = game
+    _worker_cache = cache
+    _worker_instrumented = instrumented
+
+def _solve_block_worker(indices):
+    # With instrumentation on in the parent, the statistics of each block are sent back with its result
+    if not _worker_instrumented:
+        return solve_block(_worker_game, indices, _worker_cache), None
+    with instrumentation.instrumented() as stats:
+        nei = solve_block(_worker_game, indices, _worker_cache)
+    return nei, stats.as_dict()
+
+def _solve_chunk_worker(chunk):
+    return [_solve_block_worker(indices) for indices in chunk]
+
+def _chunk_results(results, chunks, budget, stats):
+    # The blocks solved by the pool, one at a time and in order; raises TimeoutError at the deadline
+    for chunk in chunks:
+        for nei, block_stats in results.next(budget.remaining_time()):
+            if block_stats is not None:
+                stats.merge(block_stats)
+            yield nei
+
+def support_size(indices):
+    return sum(len(index) for index in indices)
+
+def solved_blocks(game, min_gbs, processes=None, chunksize=8, cache=None, budget=None,
+                  shared_memory=False, symmetric=False):
+    """Solve the blocks of the support profiles that are not above a minimal block in min_gbs, in the order of 
+    potential_support_pairs, until the budget runs out. The first tier, of pure-strategy profiles, is solved 
+    in one pass by pure_blocks and does not count towards max_blocks. With processes set, the blocks of each 
+    total support size are solved in a process pool, dispatched in chunks, and yielded in order. A tier is only 
+    started once the previous one has been consumed: minimal blocks found in a tier cannot prune blocks of the 
+    same size, so the pruning is the same as in the serial path. With shared_memory, the workers read the 
+    payoffs from one shared copy instead of receiving the game pickled. With symmetric, only the first support 
+    profile of each orbit under the symmetries of the game is solved, and the blocks of the other profiles of 
+    the orbit are its images; these do not count towards max_blocks."""
+
+    if budget is None:
+        budget = Budget()
+    orbits = support_orbits(game) if symmetric else None
+
+    if processes is None:
+        # One profile at a time, so the budget is checked before every block
+        def solve(to_solve):
+            return (solve_block(game, indices, cache) for indices in to_solve)
+
+        yield from tiered_blocks(game, min_gbs, budget, orbits, solve, 1)
+    elif shared_memory:
+        with SharedPayoffs(game) as shared:
+            yield from parallel_solved_blocks(game, min_gbs, processes, chunksize, cache, budget, shared.handle, orbits)
+    else:
+        yield from parallel_solved_blocks(game, min_gbs, processes, chunksize, cache, budget, orbits=orbits)
+
+def parallel_solved_blocks(game, min_gbs, processes, chunksize, cache, budget, shared=None, orbits=None):
+    stats = instrumentation.current()
+    initargs = (None if shared else game, cache, stats is not None, shared)
+    with Pool(processes, initializer=_init_block_worker, initargs=initargs) as pool:
+        def solve(to_solve):
+            # Chunks are sent as single tasks so that waiting on each one can be bounded by the deadline
+            chunks = [to_solve[i:i + chunksize] for i in range(0, len(to_solve), chunksize)]
+            return _chunk_results(pool.imap(_solve_chunk_worker, chunks), chunks, budget, stats)
+
+        yield from tiered_blocks(game, min_gbs, budget, orbits, solve, processes * chunksize * 4)
+
+def tiered_blocks(game, min_gbs, budget, orbits, solve, batch_size):
+    """The search of solved_blocks, tier by tier and in batches of up to batch_size profiles, shared by the serial
+    and the parallel path. solve(to_solve) returns an iterator over the blocks of a list of profiles, in order,
+    which raises TimeoutError when the deadline passes while it waits."""
+
+    for size, tier in groupby(potential_support_pairs(game), key=support_size):
+        if not budget.within_size(size):
+            return
+        if size == game.num_players:
+            yield from pure_blocks(game)
+            budget.cover(size)
             continue
-            
-        if not admissible_block(bg):
+        if orbits is not None:
+            orbits.clear()
+        for batch in iter(lambda: list(islice(tier, batch_size)), []):
+            candidates = screened(batch, min_gbs, budget)
+            images = orbit_images(candidates, orbits)
+            to_solve = [indices for indices in candidates if indices not in images]
+            if to_solve and budget.spent():
+                return
+            remaining = budget.remaining_blocks()
+            truncated = remaining is not None and remaining < len(to_solve)
+            if not (yield from batch_blocks(candidates, images, orbits, solve(to_solve[:remaining]), budget)):
+                return
+            if truncated:
+                budget.exhausted = 'max_blocks'
+                return
+        budget.cover(size)
+
+def screened(batch, min_gbs, budget):
+    """The profiles of a batch within the per-player limit of the budget and not above a minimal block"""
+
+    allowed = [indices for indices in batch if budget.allows(indices)]
+    candidates = [indices for indices in allowed if not min_gbs.any_below(indices)]
+    instrumentation.count('supports_enumerated', len(batch))
+    if len(allowed) < len(batch):
+        instrumentation.count('pruned_by_budget', len(batch) - len(allowed))
+    if len(candidates) < len(allowed):
+        instrumentation.count('pruned_by_mgb_check', len(allowed) - len(candidates))
+    return candidates
+
+def orbit_images(candidates, orbits):
+    """The profiles whose orbit was opened by an earlier profile, solved before or among the candidates, with the 
+    first profile of the orbit and the relabelling to them"""
+
+    images = {}
+    if orbits is None:
+        return images
+    in_batch = set(candidates)
+    for indices in candidates:
+        orbit = orbits.orbit_of(indices)
+        if orbit is not None and (orbit[0] in orbits.solved or orbit[0] in in_batch):
+            images[indices] = orbit
+    return images
+
+def batch_blocks(candidates, images, orbits, solved, budget):
+    """Yield the blocks of the candidates in order, the images from the orbits and the others from solved, until 
+    solved runs out. Returns False if the deadline passed while waiting for a block."""
+
+    for indices in candidates:
+        if indices in images:
+            instrumentation.count('solved_by_symmetry')
+            yield indices, orbits.image(*images[indices])
             continue
-        #tic = time.perf_counter()
-        pot_sols = zero_solver(bg, 1e-6)
-        #toc = time.perf_counter()
-        #print(f"nash solver took {toc - tic:0.4f} seconds")
-        #tic = time.perf_counter()
-        nei = ne_index(pot_sols, indices, game)
-        #toc = time.perf_counter()
-        #print(f"ne_index took {toc - tic:0.4f} seconds")
-        
-        if nei:
-            bg_ne_index.append([indices, nei])
-        
-        ne_index_list = [bg[1] for bg in bg_ne_index if are_nested_indices(bg[0], indices)]
-        index_counter = 0
+        try:
+            nei = next(solved)
+        except TimeoutError:
+            budget.exhausted = 'deadline'
+            return False
+        except StopIteration:
+            break
+        budget.blocks_solved += 1
+        if orbits is not None:
+            orbits.record(indices, nei)
+        yield indices, nei
+    return True
+
+def min_game_blocks(game, processes=None, chunksize=8, cache=None, budget=None, shared_memory=False, symmetric=False):
+    """Yield the minimal game blocks of the game with the equilibria and indices of the blocks nested in them. 
+    With a Budget, the search stops when one of its limits is reached and the budget records the tiers that 
+    were covered. With an EquilibriumCache, a game that was solved to the end before is replayed from the 
+    cache, and block-level zeros are cached as well; a budgeted run only uses the block-level cache. With 
+    processes and shared_memory, the payoffs are placed in shared memory once for all worker processes. With 
+    symmetric, the symmetries of the game are detected and one support profile per orbit is solved (see 
+    SupportOrbits); the equilibria of the other profiles are found as images, so the order of the equilibria 
+    within a block may differ from a plain search."""
+
+    if budget is not None:
+        budget.start()
+        yield from search_min_game_blocks(game, processes, chunksize, cache, budget, shared_memory, symmetric)
+        return
+
+    if cache is not None:
+        key = cache.key('min_game_blocks', game.payoffs, tol=1e-6)
+        result = cache.get(key)
+        if result is None:
+            result = []
+            for mgb in search_min_game_blocks(game, processes, chunksize, cache,
+                                              shared_memory=shared_memory, symmetric=symmetric):
+                result.append(mgb)
+                yield mgb
+            cache.put(key, result)
+        else:
+            instrumentation.count('game_cache_hits')
+            yield from result
+        return
+
+    yield from search_min_game_blocks(game, processes, chunksize, shared_memory=shared_memory, symmetric=symmetric)
+
+def search_min_game_blocks(game, processes=None, chunksize=8, cache=None, budget=None,
+                           shared_memory=False, symmetric=False):
+    
+    # Minimal blocks found so far, and solved blocks with their equilibria and index sum
+    min_gbs = SupportLattice(game.num_strategies)
+    bg_ne_index = SupportLattice(game.num_strategies)
         
-        for neis in ne_index_list:
-            index_counter += sum([nei[1] for nei in neis])
-        if index_counter == 1:
-            min_gbs += (indices,)
-            yield indices, ne_index_list
\ No newline at end of file
+    for indices, nei in solved_blocks(game, min_gbs, processes, chunksize, cache, budget, shared_memory, symmetric):
+        mgb = add_solved_block(min_gbs, bg_ne_index, indices, nei)
+        if mgb is not None:
+            yield mgb
+
+def add_solved_block(min_gbs, bg_ne_index, indices, nei):
+    """Record a solved block in the lattices of a search. Returns the minimal block with the equilibria of 
+    the blocks nested in it if the indices of those sum to one, otherwise None."""
+
+    if nei is None:
+        return None
+    
+    if nei:
+        bg_ne_index.add(indices, (nei, sum([ne[1] for ne in nei])))
+    
+    nested = bg_ne_index.below(indices)
+    index_counter = 0
+    
+    for _, index_sum in nested:
+        index_counter += index_sum
+    if index_counter == 1:
+        min_gbs.add(indices)
+        instrumentation.count('minimal_blocks')
+        return indices, [neis for neis, _ in nested]
+    return None
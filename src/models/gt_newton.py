@@ -0,0 +1,59 @@
+import numpy as np
+
+# Newton's method on the payoff difference and probability sum equations, used to polish the endpoints of
+# the homotopy paths in zero_solver.
+
+def natural_tensors(payoffs):
+    """ The payoff arrays with the strategy axes in player order"""
+    return [np.moveaxis(np.asarray(payoff), 0, p) for p, payoff in enumerate(payoffs)]
+
+def indifference_system(tensors, x):
+    """ Value and Jacobian at x of the equations in calculate_payoff_diff_and_prob_sum_equations,
+    for payoff tensors in player order. x holds the probabilities of all players one after the other."""
+
+    n = len(tensors)
+    num_strategies = tensors[0].shape
+    offsets = np.cumsum([0, *num_strategies[:-1]])
+    probs = [x[offset:offset + num] for offset, num in zip(offsets, num_strategies)]
+    D = len(x)
+
+    F = np.zeros(D, dtype=complex)
+    J = np.zeros((D, D), dtype=complex)
+
+    row = 0
+    for p in range(n):
+        num = num_strategies[p]
+        payoff = None
+        for q in range(n):
+            if q == p:
+                continue
+            operands = [tensors[p], list(range(n))]
+            for r in range(n):
+                if r not in (p, q):
+                    operands += [probs[r], [r]]
+            pair_payoff = np.einsum(*operands, [p, q])
+            J[row:row + num - 1, offsets[q]:offsets[q] + num_strategies[q]] = pair_payoff[:-1] - pair_payoff[-1]
+            if payoff is None:
+                payoff = pair_payoff @ probs[q]
+        F[row:row + num - 1] = payoff[:-1] - payoff[-1]
+        row += num - 1
+
+    for p in range(n):
+        F[row] = probs[p].sum() - 1
+        J[row, offsets[p]:offsets[p] + num_strategies[p]] = 1
+        row += 1
+
+    return F, J
+
+def newton(tensors, x, iterations, tol):
+    """ Newton's method on the system; returns the point and whether the last step was below tol"""
+    for _ in range(iterations):
+        F, J = indifference_system(tensors, x)
+        try:
+            step = np.linalg.solve(J, -F)
+        except np.linalg.LinAlgError:
+            return x, False
+        x = x + step
+        if np.linalg.norm(step) <= tol * (1 + np.linalg.norm(x)):
+            return x, True
+    return x, False
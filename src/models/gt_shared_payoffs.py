@@ -0,0 +1,60 @@
+from multiprocessing import shared_memory
+import numpy as np
+from src.models.gt_game_class import create_n_player_game
+
+class SharedPayoffs:
+    """
+    The payoff arrays and the payoff tensor of a game, placed once in a shared memory segment.
+
+    ...
+
+    Worker processes attach to the segment by name with attach_game and read the payoffs through
+    read-only views, so the memory used for the payoffs does not grow with the number of workers.
+    The process that created the segment removes it with close(), or at the end of a with block.
+
+    Attributes
+    ----------
+    handle : tuple
+        the segment name and the (offset, shape) of each array, to be passed to attach_game
+
+    Methods
+    -------
+    close()
+        releases and removes the shared memory segment
+    """
+    def __init__(self, game):
+        arrays = [*game.payoffs, game.tensor]
+        specs = []
+        size = 0
+        for array in arrays:
+            specs.append((size, array.shape))
+            size += array.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (offset, shape), array in zip(specs, arrays):
+            np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf, offset=offset)[...] = array
+        self.handle = (self.shm.name, specs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_game(handle):
+    """ Attach to a SharedPayoffs segment and build the game on read-only views of it. Returns the segment,
+    which must be kept alive as long as the game is used, and the game."""
+
+    name, specs = handle
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = []
+    for offset, shape in specs:
+        array = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays.append(array)
+    game = create_n_player_game(arrays[:-1])
+    game._tensor = arrays[-1]
+    return shm, game
@@ -0,0 +1,69 @@
+class SupportLattice:
+    """
+    An index of support profiles encoded as bitmasks, answering subset queries.
+
+    ...
+
+    A support profile (one tuple of strategies per player) is stored as one bitmask per player,
+    packed side by side into a single integer, so checking whether one profile is nested in
+    another is a single integer operation. Profiles are bucketed by the bitmask of the first
+    player, and a query only visits the buckets of the submasks of its own first-player mask.
+
+    Attributes
+    ----------
+    num_strategies : list
+        a list of the number of strategies for each player
+    offsets : list
+        bit offset of each player's mask in the packed bitmask
+    buckets : dict
+        stored entries (insertion number, packed bitmask, value) keyed by the first player's bitmask
+
+    Methods
+    -------
+    add(indices, value)
+        stores a support profile with an associated value
+    below(indices)
+        returns the values of the stored profiles nested in indices, in insertion order
+    any_below(indices)
+        returns whether some stored profile is nested in indices
+    """
+    def __init__(self, num_strategies):
+        self.num_strategies = num_strategies
+        self.offsets = [sum(num_strategies[:p]) for p in range(len(num_strategies))]
+        self.buckets = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def masks(self, indices):
+        """ The bitmask of each player's support"""
+        return [sum(1 << s for s in index) for index in indices]
+
+    def pack(self, masks):
+        return sum(mask << offset for mask, offset in zip(masks, self.offsets))
+
+    def add(self, indices, value=None):
+        masks = self.masks(indices)
+        self.buckets.setdefault(masks[0], []).append((self._count, self.pack(masks), value))
+        self._count += 1
+
+    def _nested(self, indices):
+        masks = self.masks(indices)
+        outside = ~self.pack(masks)
+        first = masks[0]
+        # Walk all submasks of the first player's mask
+        sub = first
+        while True:
+            for entry in self.buckets.get(sub, ()):
+                if entry[1] & outside == 0:
+                    yield entry
+            if sub == 0:
+                break
+            sub = (sub - 1) & first
+
+    def below(self, indices):
+        return [entry[2] for entry in sorted(self._nested(indices))]
+
+    def any_below(self, indices):
+        return next(self._nested(indices), None) is not None
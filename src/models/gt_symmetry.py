@@ -0,0 +1,147 @@
+import numpy as np
+from src.models import gt_instrumentation as instrumentation
+
+# Symmetries of a game: a relabelling g of the players (pi) and of each player's strategies (sigma) under which
+# the payoffs are unchanged, u_pi(p)(g.s) = u_p(s) for every pure profile s, where (g.s)_pi(p) = sigma_p(s_p).
+# Blocks of support profiles in the same orbit have the same equilibria up to g, with the same indices, so only
+# the first profile of each orbit has to be solved.
+
+def identity(num_strategies):
+    return (np.arange(len(num_strategies)), [np.arange(num) for num in num_strategies])
+
+def compose(h, g):
+    """ The relabelling h after g"""
+    h_pi, h_sigma = h
+    g_pi, g_sigma = g
+    return (h_pi[g_pi], [h_sigma[g_pi[p]][g_sigma[p]] for p in range(len(g_pi))])
+
+def is_symmetry(tensor, g):
+    """ Whether the payoff tensor (num_players, *num_strategies) is unchanged by the relabelling g"""
+    pi, sigma = g
+    n = len(pi)
+    inverse_pi = np.argsort(pi)
+    inverse_sigma = [np.argsort(perm) for perm in sigma]
+    for p in range(n):
+        # image[t] = tensor[p][s] with t = g.s
+        image = np.transpose(tensor[p], inverse_pi)[np.ix_(*[inverse_sigma[inverse_pi[k]] for k in range(n)])]
+        if not np.array_equal(image, tensor[pi[p]]):
+            return False
+    return True
+
+def find_symmetries(game):
+    """ Generators of the symmetries of the game found among swaps of two players with the same number of
+    strategies (keeping strategy labels) and swaps of two strategies of one player. Symmetries that need
+    both at once are not found, which only means less work is saved."""
+
+    tensor = game.tensor
+    num_strategies = game.num_strategies
+    n = game.num_players
+    generators = []
+    for p in range(n):
+        for q in range(p + 1, n):
+            if num_strategies[p] != num_strategies[q]:
+                continue
+            pi, sigma = identity(num_strategies)
+            pi[[p, q]] = pi[[q, p]]
+            if is_symmetry(tensor, (pi, sigma)):
+                generators.append((pi, sigma))
+    for p in range(n):
+        for i in range(num_strategies[p]):
+            for j in range(i + 1, num_strategies[p]):
+                pi, sigma = identity(num_strategies)
+                sigma[p][[i, j]] = sigma[p][[j, i]]
+                if is_symmetry(tensor, (pi, sigma)):
+                    generators.append((pi, sigma))
+    return generators
+
+def apply_to_support(g, indices):
+    pi, sigma = g
+    image = [None] * len(pi)
+    for p, index in enumerate(indices):
+        image[pi[p]] = tuple(sorted(int(sigma[p][s]) for s in index))
+    return tuple(image)
+
+def apply_to_profile(g, profile):
+    pi, sigma = g
+    image = [None] * len(pi)
+    for p, probs in enumerate(profile):
+        probs = np.asarray(probs)
+        permuted = np.empty_like(probs)
+        permuted[sigma[p]] = probs
+        image[pi[p]] = permuted
+    return image
+
+class SupportOrbits:
+    """
+    The orbits of support profiles under the symmetries of a game, met in the order of potential_support_pairs.
+
+    ...
+
+    All profiles of an orbit have the same support sizes up to the order of the players, so they are in the
+    same tier, and the first one met is the lexicographically smallest. When a profile opens a new orbit, the
+    other members are registered with the relabelling that maps the first profile to them, and the block of
+    a member is the image of the solved block of the first profile.
+
+    Attributes
+    ----------
+    generators : list
+        relabellings (pi, sigma) generating the symmetries, as found by find_symmetries
+    members : dict
+        (first profile, relabelling) of the profiles of the open orbits that have not been met yet
+    solved : dict
+        solved blocks of the first profiles of the open orbits
+
+    Methods
+    -------
+    orbit_of(indices)
+        returns None for the first profile of an orbit, otherwise its first profile and relabelling
+    record(indices, nei)
+        stores the solved block of the first profile of an orbit
+    image(first, g)
+        returns the block of a member as the image of the block of the first profile
+    clear()
+        forgets the open orbits, at the start of a new tier
+    """
+    def __init__(self, game, generators):
+        self.num_strategies = game.num_strategies
+        self.generators = generators
+        self.members = {}
+        self.solved = {}
+
+    def orbit_of(self, indices):
+        if indices in self.members:
+            return self.members.pop(indices)
+        queue = [(indices, identity(self.num_strategies))]
+        seen = {indices}
+        while queue:
+            support, g = queue.pop()
+            for generator in self.generators:
+                image = apply_to_support(generator, support)
+                if image not in seen:
+                    seen.add(image)
+                    h = compose(generator, g)
+                    self.members[image] = (indices, h)
+                    queue.append((image, h))
+        return None
+
+    def record(self, indices, nei):
+        self.solved[indices] = nei
+
+    def image(self, first, g):
+        nei = self.solved[first]
+        if nei is None:
+            return None
+        return [(apply_to_profile(g, m_sp), index) for m_sp, index in nei]
+
+    def clear(self):
+        self.members.clear()
+        self.solved.clear()
+
+def support_orbits(game):
+    """ SupportOrbits of the symmetries of the game, or None if none are found"""
+
+    generators = find_symmetries(game)
+    instrumentation.count('symmetry_generators', len(generators))
+    if not generators:
+        return None
+    return SupportOrbits(game, generators)
@@ -1,5 +1,8 @@
 import sympy as sp
+import numpy as np
 import itertools
+import functools
+from collections import namedtuple
 
 def calculate_expected_payoff_diff_equations(game, probabilities):
     """Given that all other players play according to some mixed-strategy profile, 
@@ -70,39 +73,121 @@ def calculate_payoff_diff_and_prob_sum_equations(game):
     return equations
 
 
+# Coefficient and degree arrays of the same system, in the form taken by pypolsys.polsys.init_poly
+
+def sorted_monomials(deg):
+    """Order degree rows the way pypolsys.utils.fromSympy does (by the degree of the first variable, then the second, ...)"""
+    order = np.lexsort(np.fliplr(deg).T)
+    return order, deg[order]
+
+def polsys_monomials(num_strategies):
+    """The monomials of the system in calculate_payoff_diff_and_prob_sum_equations only depend on the number of strategies.
+    For each player, return the sorted order of the opponent profiles (C order of the payoff array) with their degree rows, 
+    and the sorted order and degree rows of the probability sum equation (constant term first)."""
+
+    n = len(num_strategies)
+    D = sum(num_strategies)
+    offsets = np.cumsum([0, *num_strategies[:-1]])
+
+    payoff_monomials = []
+    for p in range(n):
+        others = [q for q in range(n) if q != p]
+        profiles = np.array(list(np.ndindex(*[num_strategies[q] for q in others]))).reshape(-1, len(others))
+        deg = np.zeros((len(profiles), D), dtype=np.int32)
+        for column, q in enumerate(others):
+            deg[np.arange(len(profiles)), offsets[q] + profiles[:, column]] = 1
+        payoff_monomials.append(sorted_monomials(deg))
+
+    sum_monomials = []
+    for p in range(n):
+        deg = np.zeros((num_strategies[p] + 1, D), dtype=np.int32)
+        deg[np.arange(1, num_strategies[p] + 1), offsets[p] + np.arange(num_strategies[p])] = 1
+        sum_monomials.append(sorted_monomials(deg))
+
+    return payoff_monomials, sum_monomials
+
+# Compiled templates of the system, keyed by the number of strategies of each player. A template holds
+# everything that does not depend on the payoffs; a block only gathers its payoff differences into it.
+# The cached arrays are shared between calls and must not be modified.
+
+EQUATION_TEMPLATE_CACHE_SIZE = 256
+
+EquationTemplate = namedtuple('EquationTemplate', ['num_variables', 'n_coef_per_eq', 'all_deg', 'gather', 'sum_coef'])
+
+@functools.lru_cache(maxsize=EQUATION_TEMPLATE_CACHE_SIZE)
+def equation_template(num_strategies):
+    """Compile the system in calculate_payoff_diff_and_prob_sum_equations for a tuple of numbers of strategies. 
+    gather maps the coefficients of the payoff difference equations to positions in the concatenated, flattened 
+    payoff differences of all players; sum_coef holds the coefficients of the probability sum equations. 
+    Use equation_template.cache_info() for hit/miss counts and cache_clear() to empty the cache."""
+
+    payoff_monomials, sum_monomials = polsys_monomials(num_strategies)
+
+    n_coef_per_eq = []
+    all_deg = []
+    gather = []
+    sum_coef = []
+
+    base = 0
+    for p, num in enumerate(num_strategies):
+        order, deg = payoff_monomials[p]
+        for s in range(num - 1):
+            gather.append(base + s * len(order) + order)
+            all_deg.append(deg)
+            n_coef_per_eq.append(len(order))
+        base += (num - 1) * len(order)
+
+    for p, num in enumerate(num_strategies):
+        order, deg = sum_monomials[p]
+        coef = np.ones(len(order))
+        coef[0] = -1
+        sum_coef.append(coef[order])
+        all_deg.append(deg)
+        n_coef_per_eq.append(len(order))
+
+    gather = np.concatenate(gather) if gather else np.zeros(0, dtype=np.intp)
+    return EquationTemplate(sum(num_strategies), np.array(n_coef_per_eq, dtype=np.int32), np.vstack(all_deg),
+                            gather, np.concatenate(sum_coef))
+
+def calculate_payoff_diff_and_prob_sum_coefficients(game):
+    """Build the (N, n_coef_per_eq, all_coef, all_deg) arguments of pypolsys.polsys.init_poly for the system in 
+    calculate_payoff_diff_and_prob_sum_equations directly from the payoff arrays. The coefficients of the payoff 
+    difference equations are the payoff differences to the player's last strategy."""
+
+    return payoff_diff_and_prob_sum_coefficients(game.payoffs)
+
+def payoff_diff_and_prob_sum_coefficients(payoffs):
+    """The same arguments built from a list of payoff arrays, which may be complex"""
+
+    template = equation_template(tuple(payoff.shape[0] for payoff in payoffs))
+    diffs = np.concatenate([(payoff[:-1] - payoff[-1]).ravel() for payoff in payoffs])
+    all_coef = np.concatenate([diffs[template.gather], template.sum_coef]).astype(complex)
+
+    return template.num_variables, template.n_coef_per_eq, all_coef, template.all_deg
+
+
 # Function for determining whether a strategic is strictly dominated
 
+def dominated_strategy_mask(payoff):
+    """Given one player's payoff array (own strategies on the first axis), return a boolean array marking the 
+    pure strategies that are strictly dominated by another pure strategy. Each strategy's payoffs over all 
+    opponent profiles are compared as one slice; ties count as dominated, as in the original pairwise loop, 
+    which makes no difference for generic games."""
+
+    flat = payoff.reshape(payoff.shape[0], -1)
+    weakly_below = np.all(flat[:, np.newaxis, :] <= flat[np.newaxis, :, :], axis=2)
+    np.fill_diagonal(weakly_below, False)
+    return weakly_below.any(axis=1)
+
+def strictly_dominated_strategies(game):
+    """Return the dominated-strategy mask of every player in the game"""
+
+    return [dominated_strategy_mask(payoff) for payoff in game.payoffs]
+
 def is_strategy_strictly_dominated(game, player, strategy):
     """Given a player and a pure strategy, check if the strategy is strictly dominated by another (pure) strategy"""
     
-    # Get payoffs from player playing a certain strategy
-
-    def get_payoff(indices, player, strategy):
-        payoff = game.payoffs[player][strategy]
-        for i, index in enumerate(indices):
-            if i != player:
-                payoff = payoff[index]
-        return payoff
-    
-    other_strategies = [i for i in range(game.num_strategies[player]) if i != strategy]
-    
-    for other_strategy in other_strategies:
-        temp = 0
-        temp2 = 0
-        for indices in itertools.product(*[range(game.num_strategies[p]) if p != player 
-                                            else other_strategies for p in range(game.num_players)]):
-            temp2 += 1
-            payoff_current_strategy = get_payoff(indices, player, strategy)
-
-            payoff_other_strategy = get_payoff(indices, player, other_strategy)
-            
-            if payoff_current_strategy > payoff_other_strategy:
-                break
-            else:
-                temp += 1
-        if temp == temp2: return True
-            
-    return False
+    return bool(dominated_strategy_mask(game.payoffs[player])[strategy])
 
 
 
@@ -112,53 +197,89 @@ def admissible_block(game):
     """ A block is admissible if in the block game there is no player that has a pure strategy 
     that is strictly dominated by another pure strategy. """
 
+    return not any(mask.any() for mask in strictly_dominated_strategies(game))
+
+# Pure-strategy equilibria, found for all pure-strategy profiles in one pass over the payoff tensor
+
+def pure_nash_mask(game):
+    """Boolean array of shape num_strategies marking the pure-strategy profiles that are Nash equilibria: 
+    each player's strategy is a best response, attaining the maximum of the player's payoff along its own axis. 
+    A tie with the best response is not a profitable deviation, as in profitable_deviations."""
+
+    mask = np.ones(game.num_strategies, dtype=bool)
     for p in range(game.num_players):
-        for s in range(game.num_strategies[p]):
-            if is_strategy_strictly_dominated(game, p, s):
-                return False
-    return True
+        payoff = game.tensor[p]
+        mask &= payoff >= payoff.max(axis=p, keepdims=True)
+    return mask
+
+def pure_equilibria(game):
+    """The pure-strategy Nash equilibria as support profiles of one strategy per player, in the 
+    lexicographic order of potential_support_pairs"""
+
+    return pure_profiles(pure_nash_mask(game))
+
+def pure_profiles(mask):
+    """The pure-strategy profiles marked in a boolean array of shape num_strategies, as support profiles"""
+
+    return [tuple((int(s),) for s in profile) for profile in np.argwhere(mask)]
 
 # Functions to check whether a completely mixed Nash equilibrium of block game is Nash in larger game
 
-def is_strategy_better(game, mixed_strategy_profile, player, new_strategy):
+def expected_payoff_vector(game, mixed_strategy_profile, player):
+    """Expected payoff to a player from each of its pure strategies given that all other players play 
+    according to the mixed-strategy profile. The opponents' axes of the payoff array are contracted 
+    with their probability vectors, last player first."""
 
-    num_players = game.num_players
-    num_strategies = game.num_strategies
-    probabilities = game.proba
-    
-    def expected_payoff(player, strategy):
+    payoff = game.payoffs[player]
+    for p in reversed(range(game.num_players)):
+        if p != player:
+            payoff = payoff @ np.asarray(mixed_strategy_profile[p])
+    return payoff
 
-        payoff = 0
+def pairwise_expected_payoffs(game, mixed_strategy_profile, player, other):
+    """Expected payoff to a player from each pair of pure strategies of the player and another player, 
+    given that all remaining players play according to the mixed-strategy profile. 
+    Returns an array of shape (num_strategies[player], num_strategies[other])."""
 
-        # Create a modified list of strategy ranges, replacing the player's strategy range with [strategy]
-        strategy_ranges = [range(num_strategies[p]) if p != player else [strategy] for p in range(num_players)]
-        for indices in itertools.product(*strategy_ranges):
-            probability_combination = [probabilities[p][indices[p]] if p != player else 1 for p in range(num_players)]
-            payoff_value = game.payoffs[player][strategy]
-            for i, index in enumerate(indices):
-                if i != player:
-                    payoff_value = payoff_value[index]
-            payoff_term = payoff_value * sp.prod(probability_combination)
+    n = game.num_players
+    operands = [game.tensor[player], list(range(n))]
+    for p in range(n):
+        if p not in (player, other):
+            operands += [np.asarray(mixed_strategy_profile[p]), [p]]
+    return np.einsum(*operands, [player, other])
 
-            payoff += payoff_term
-        return payoff
+def expected_payoffs(game, mixed_strategy_profile):
+    """Expected payoff of every pure strategy for every player against the mixed-strategy profile"""
+
+    return [expected_payoff_vector(game, mixed_strategy_profile, p) for p in range(game.num_players)]
+
+def deviation_gains(game, mixed_strategy_profile):
+    """For every player, the gain from switching to each pure strategy compared to the expected payoff 
+    of the player's own mixed strategy in the profile."""
+
+    gains = []
+    for p, payoff in enumerate(expected_payoffs(game, mixed_strategy_profile)):
+        gains.append(payoff - np.dot(np.asarray(mixed_strategy_profile[p]), payoff))
+    return gains
+
+def profitable_deviations(game, mixed_strategy_profile, block_index):
+    """For every player, the pure strategies outside block_index[player] that do strictly better 
+    than the mixed-strategy profile. The profile is a Nash equilibrium of the game if all are empty."""
+
+    deviations = []
+    for p, gains in enumerate(deviation_gains(game, mixed_strategy_profile)):
+        outside = np.ones(game.num_strategies[p], dtype=bool)
+        outside[list(block_index[p])] = False
+        deviations.append(np.flatnonzero(outside & (gains > 0)))
+    return deviations
+
+def is_strategy_better(game, mixed_strategy_profile, player, new_strategy):
+
+    payoff = expected_payoff_vector(game, mixed_strategy_profile, player)
 
-    def expected_payoff_from_mixed_strategy(player):
-        total_payoff = 0
-        for strategy in range(num_strategies[player]):
-            total_payoff += probabilities[player][strategy] * expected_payoff(player, strategy)
-        return total_payoff
-
-    # Calculate the current expected payoff
-    current_expected_payoff = expected_payoff_from_mixed_strategy(player)
-    potential_expected_payoff = expected_payoff(player, new_strategy)
-
-    for p,s in enumerate(num_strategies):
-        current_expected_payoff = current_expected_payoff.subs([(probabilities[p][i], mixed_strategy_profile[p][i]) for i in range(s)])
-    # Calculate the expected payoff if the player switches to the new strategy
-        potential_expected_payoff = potential_expected_payoff.subs([(probabilities[p][i], mixed_strategy_profile[p][i]) for i in range(s)])
-    # Check if the new strategy is better
-    return potential_expected_payoff > current_expected_payoff
+    # Compare the expected payoff of the new strategy with the current expected payoff
+    current_expected_payoff = np.dot(np.asarray(mixed_strategy_profile[player]), payoff)
+    return bool(payoff[new_strategy] > current_expected_payoff)
 
 #Project the zero in the smaller game onto the larger game
 
@@ -1,39 +1,138 @@
 import pypolsys
 import numpy as np
-from src.models.gt_utils import calculate_payoff_diff_and_prob_sum_equations
+from src.models.gt_utils import payoff_diff_and_prob_sum_coefficients
+from src.models.gt_newton import natural_tensors, newton
+from src.models import gt_instrumentation as instrumentation
 
-#Given a generic game, solve for all zeros and output the real ones
-def zero_solver(game, tol):
-    D = sum(game.num_strategies)
-    pol = pypolsys.utils.fromSympy(calculate_payoff_diff_and_prob_sum_equations(game))
+# In a two-player block the indifference conditions are linear. Each player's conditions only involve the
+# opponent's probabilities: the payoff differences to the last strategy weighted by the opponent's
+# probabilities are zero and the probabilities sum to one.
+def indifference_matrix(payoff):
+    return np.vstack([payoff[:-1] - payoff[-1], np.ones(payoff.shape[1])])
+
+def bimatrix_solver(game, tol):
+    k1, k2 = game.num_strategies
+    # With unequal support sizes one of the two linear systems is overdetermined, so a generic block has no zero
+    if k1 != k2:
+        return []
+    # Solve both players' systems in one batched call; the first gives player 2's strategy and vice versa
+    matrices = np.stack([indifference_matrix(payoff) for payoff in game.payoffs])
+    rhs = np.zeros((2, k1, 1))
+    rhs[:, -1] = 1
+    try:
+        y, x = np.linalg.solve(matrices, rhs)[..., 0]
+    except np.linalg.LinAlgError:
+        return []
+    if not (np.all(np.isfinite(x)) and np.all(np.isfinite(y))) or np.any(x < tol) or np.any(y < tol):
+        return []
+    return [[x, y]]
+
+# The equations are multilinear across players: each payoff difference equation has degree one in the
+# probabilities of every other player and none in the player's own, and each probability sum has degree one
+# in the player's own. Grouping the variables by player gives an m-homogeneous start system whose Bezout
+# number follows that structure instead of the total degree. Variables are numbered from 1 as in pypolsys.
+def player_partition(num_strategies):
+    offsets = np.cumsum([0, *num_strategies[:-1]])
+    return [list(range(offset + 1, offset + num + 1)) for offset, num in zip(offsets, num_strategies)]
+
+# Path tracking tolerances of POLSYS_PLP: tracking, end game and singularity (0 for the library default).
+# Looser tolerances make paths jump to a zero another path reaches, so zero_solver tracks a block again at
+# these when two endpoints coincide.
+TRACKTOL = 1e-8
+FINALTOL = 1e-15
+SINGTOL = 0.0
+
+#Track all homotopy paths for the system of a list of payoff arrays. Returns the roots as columns and the
+#status of each path (POLSYS_PLP IFLAG2, 1 + 10*cycle number for a normal return).
+def homotopy_roots(payoffs, multihomogeneous, tracktol=TRACKTOL, finaltol=FINALTOL, singtol=SINGTOL):
+    num_strategies = [payoff.shape[0] for payoff in payoffs]
+    D = sum(num_strategies)
+    pol = payoff_diff_and_prob_sum_coefficients(payoffs)
     pypolsys.polsys.init_poly(*pol)
-    part = pypolsys.utils.make_h_part(D)
+    if multihomogeneous:
+        part = pypolsys.utils.make_mh_part(D, player_partition(num_strategies))
+    else:
+        part = pypolsys.utils.make_h_part(D)
     pypolsys.polsys.init_partition(*part)
-    bplp = pypolsys.polsys.solve(1e-8, 1e-15, 0.0)
-    r = pypolsys.polsys.myroots
-    def remove_near_zero_complex(array, tol):
-        # Check if the imaginary or real part of any element in a row is close to zero
-        is_complex_close_to_zero = lambda row: any(x.real < tol or abs(x.imag) > tol for x in row)
-    
-        # Create a mask to filter out rows with complex elements close to zero
-        mask = np.array([not is_complex_close_to_zero(row) for row in array])
-    
-        # Return the real parts of the filtered array
-        return np.real(array[mask])
-    
-    def subset_list(input_list, lengths):
-        sublists = []
-        start = 0
+    bplp = pypolsys.polsys.solve(tracktol, finaltol, singtol)
+    return pypolsys.polsys.myroots[:D, :].copy(), pypolsys.polsys.path_status.copy()
 
-        for length in lengths:
-            sublists.append(input_list[start:start + length])
-            start += length
+# Endpoints within this distance of the positive reals are polished before the final test against tol,
+# so a zero the tracker left slightly off the real axis is not lost
+POLISH_WINDOW = 1e-3
+POLISH_STEPS = 5
 
-        return sublists
-    
-    ok_sol = remove_near_zero_complex(r[:D,:].transpose(), tol)
-    output = []
-    for sol in ok_sol:
-        output.append(subset_list(sol, game.num_strategies))        
+def polish_roots(payoffs, roots, window=POLISH_WINDOW, steps=POLISH_STEPS):
+    """ Newton steps on the indifference system for the finite endpoints (columns of roots) near the positive 
+    reals. An endpoint on which Newton's method does not converge is kept as it is."""
+
+    near_real = (np.all(np.isfinite(roots), axis=0) & np.all(np.abs(roots.imag) <= window, axis=0)
+                 & np.all(roots.real >= -window, axis=0))
+    tensors = natural_tensors(payoffs)
+    roots = roots[:, near_real].copy()
+    for i in range(roots.shape[1]):
+        x, converged = newton(tensors, roots[:, i], steps, 1e-13)
+        if converged:
+            roots[:, i] = x
+    return roots
+
+def distinct_roots(roots, rtol=1e-6):
+    """ The columns of roots with near-identical ones merged, keeping the first of each cluster"""
+
+    kept = []
+    for i in range(roots.shape[1]):
+        scale = 1 + np.linalg.norm(roots[:, i])
+        if not kept or np.min(np.linalg.norm(roots[:, kept] - roots[:, [i]], axis=0)) >= rtol * scale:
+            kept.append(i)
+    return roots[:, kept]
+
+#The endpoints of all paths of the homotopy of a block, as columns
+def tracked_roots(game, multihomogeneous, tracktol, finaltol):
+    r, _ = homotopy_roots(game.payoffs, multihomogeneous, tracktol, finaltol)
+    instrumentation.count('homotopy_paths', r.shape[1])
+    return r[:sum(game.num_strategies), :]
+
+def jumped(endpoints):
+    """ Whether two paths ended at the same finite zero"""
+    finite = np.all(np.isfinite(endpoints), axis=0) & (np.max(np.abs(endpoints), axis=0) < 1e8)
+    return distinct_roots(endpoints[:, finite]).shape[1] < np.count_nonzero(finite)
+
+#Given a generic game, solve for all zeros and output the real ones. By default games with three or more
+#players are solved with the per-player m-homogeneous partition, set multihomogeneous=False for total degree.
+#The endpoints near the positive reals are polished with Newton's method. Two paths never end at the same zero
+#of a generic block, so when endpoints coincide at looser tracktol/finaltol a path has jumped and the block is
+#tracked again at TRACKTOL/FINALTOL; endpoints that still coincide are merged. With an EquilibriumCache the
+#output is stored under the hash of the block's payoffs, so blocks shared between games are only solved once.
+def zero_solver(game, tol, multihomogeneous=None, cache=None, tracktol=TRACKTOL, finaltol=FINALTOL):
+    if game.num_players == 2:
+        output = bimatrix_solver(game, tol)
+        instrumentation.count('real_roots_kept', len(output))
+        return output
+    if cache is not None:
+        key = cache.key('zero_solver', game.payoffs, tol=tol, tracktol=tracktol, finaltol=finaltol)
+        output = cache.get(key)
+        if output is None:
+            output = zero_solver(game, tol, multihomogeneous, tracktol=tracktol, finaltol=finaltol)
+            cache.put(key, output)
+        else:
+            instrumentation.count('zero_solver_cache_hits')
+            instrumentation.count('real_roots_kept', len(output))
+        return output
+    if multihomogeneous is None:
+        multihomogeneous = game.num_players >= 3
+    endpoints = tracked_roots(game, multihomogeneous, tracktol, finaltol)
+    if (tracktol, finaltol) != (TRACKTOL, FINALTOL) and jumped(endpoints):
+        instrumentation.count('path_jumps')
+        endpoints = tracked_roots(game, multihomogeneous, TRACKTOL, FINALTOL)
+    candidates = polish_roots(game.payoffs, endpoints)
+    roots = distinct_roots(candidates)
+    instrumentation.count('duplicate_roots', candidates.shape[1] - roots.shape[1])
+
+    # Keep the zeros with every coordinate real and positive up to tol
+    positive = np.all(roots.real >= tol, axis=0) & np.all(np.abs(roots.imag) <= tol, axis=0)
+    ok_sol = roots[:, positive].real.T
+    splits = np.cumsum(game.num_strategies)[:-1]
+    output = [np.split(sol, splits) for sol in ok_sol]
+    instrumentation.count('real_roots_kept', len(output))
     
     return output
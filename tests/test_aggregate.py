@@ -0,0 +1,25 @@
+from src.data.gt_aggregate import aggregate
+from src.data.gt_results_store import ResultsStore
+
+def record(game, ne):
+    return {'run_seed': 0, 'game': game, 'shape': '2x2', 'ne': ne, 'indices': [1] * ne,
+            'min_blocks': [[[0], [0]]] * ne, 'seconds': 1.0, 'counters': {'homotopy_paths': 2}}
+
+def test_aggregate_summarizes_by_shape(tmp_path):
+    path = str(tmp_path / 'games_sim1_2_2.csv')
+    store = ResultsStore(path)
+    for game, ne in enumerate([1, 3, 1]):
+        store.append(record(game, ne))
+    summary = aggregate([path])['2x2']
+    assert summary['games'] == 3
+    assert summary['ne']['total'] == 5
+    assert summary['ne_distribution'] == {'1': 2, '3': 1}
+    assert summary['counters'] == {'homotopy_paths': 6}
+
+def test_aggregate_counts_a_game_stored_twice_in_a_shard_once(tmp_path):
+    path = str(tmp_path / 'shard_sim1_2_2_0_0.csv')
+    store = ResultsStore(path)
+    store.append(record(0, 1))
+    store.append(record(1, 3))
+    store.append(record(0, 1))
+    assert aggregate([path])['2x2']['games'] == 2
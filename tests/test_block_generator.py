@@ -0,0 +1,20 @@
+from itertools import product
+import numpy as np
+import pytest
+from src.models.gt_block_generator import potential_support_pairs, powerset
+from src.models.gt_game_class import create_n_player_game
+
+def sorted_support_pairs(num_strategies):
+    # The original generator: all support profiles sorted by total size, imbalance, then lexicographically
+    support_sets = [sorted(powerset(range(num)), key=lambda x: (len(x), x)) for num in num_strategies]
+    return sorted(product(*support_sets), key=lambda x: (sum(len(y) for y in x),
+                                                         max(len(y) for y in x) - min(len(y) for y in x), x))
+
+@pytest.mark.parametrize('num_strategies', [(2, 2), (3, 3), (2, 4), (4, 3), (2, 2, 2), (3, 2, 3), (2, 2, 2, 2),
+                                            (3, 2, 2, 3)])
+def test_order_matches_sorted_product(num_strategies):
+    rng = np.random.default_rng(0)
+    payoffs = [rng.random((num_strategies[p], *num_strategies[:p], *num_strategies[p + 1:]))
+               for p in range(len(num_strategies))]
+    game = create_n_player_game(payoffs)
+    assert list(potential_support_pairs(game)) == sorted_support_pairs(num_strategies)
@@ -0,0 +1,32 @@
+import numpy as np
+from src.models.gt_budget import Budget
+from src.models.gt_game_class import create_n_player_game
+from src.models.gt_min_gb_generic import min_game_blocks
+
+def random_game(shape, seed):
+    rng = np.random.default_rng(seed)
+    payoffs = []
+    for p in range(len(shape)):
+        payoffs.append(rng.normal(size=[shape[p]] + [num for q, num in enumerate(shape) if q != p]))
+    return create_n_player_game(payoffs)
+
+def test_unbudgeted_run_covers_every_tier():
+    budget = Budget()
+    list(min_game_blocks(random_game([4, 4], 3), budget=budget))
+    assert (budget.covered_size, budget.skipped, budget.exhausted) == (8, 0, None)
+
+def test_per_player_limit_leaves_tiers_uncovered():
+    for processes in (None, 2):
+        budget = Budget(max_player_support_size=2)
+        list(min_game_blocks(random_game([4, 4], 3), processes=processes, budget=budget))
+        # The tier of total size 4 holds the profiles with a support of 3 strategies
+        assert budget.covered_size == 3
+        assert budget.skipped > 0
+        assert budget.exhausted == 'max_player_support_size'
+
+def test_max_blocks_stops_the_run():
+    budget = Budget(max_blocks=3)
+    list(min_game_blocks(random_game([4, 4], 3), budget=budget))
+    assert budget.blocks_solved == 3
+    assert budget.exhausted == 'max_blocks'
+    assert not budget.complete
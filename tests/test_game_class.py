@@ -0,0 +1,16 @@
+import numpy as np
+import sympy as sp
+from src.models.gt_game_class import create_n_player_game
+
+def test_probability_symbols_are_created_on_first_use():
+    game = create_n_player_game([np.zeros((2, 3)), np.zeros((3, 2))])
+    assert game._proba is None
+    assert game.proba == [[sp.Symbol('p11'), sp.Symbol('p12')], [sp.Symbol('p21'), sp.Symbol('p22'), sp.Symbol('p23')]]
+    assert game.proba is game.proba
+
+def test_tensor_puts_strategy_axes_in_player_order():
+    payoffs = [np.arange(6.0).reshape(2, 3), np.arange(6.0).reshape(3, 2)]
+    game = create_n_player_game(payoffs)
+    assert game.tensor.shape == (2, 2, 3)
+    assert np.array_equal(game.tensor[0], payoffs[0])
+    assert np.array_equal(game.tensor[1], payoffs[1].T)
@@ -0,0 +1,68 @@
+import os
+import pytest
+from src.data.gt_results_store import ResultsStore, read_records
+
+def record(run_seed, game):
+    return {'run_seed': run_seed, 'game': game, 'shape': '2x2', 'ne': 1, 'indices': [1],
+            'min_blocks': [[[0], [1]]], 'seconds': 0.5, 'counters': {'homotopy_paths': game}}
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / 'games.csv')
+    store = ResultsStore(path)
+    for game in range(3):
+        store.append(record(7, game))
+    assert list(read_records(path)) == [record(7, game) for game in range(3)]
+    assert sorted(store.completed(7)) == [0, 1, 2]
+    assert store.completed(8) == {}
+
+def test_resume_drops_torn_row(tmp_path):
+    path = str(tmp_path / 'games.csv')
+    store = ResultsStore(path)
+    for game in range(20):
+        store.append(record(0, game))
+    # A crash while writing the last row, which is cut inside its JSON counters
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    store = ResultsStore(path, resume=True)
+    done = store.completed(0)
+    assert sorted(done) == list(range(19))
+    store.append(record(0, 19))
+    store.append(record(0, 20))
+
+    assert list(read_records(path)) == [record(0, game) for game in range(21)]
+    assert sorted(ResultsStore(path, resume=True).completed(0)) == list(range(21))
+
+def test_read_records_skips_undecodable_rows(tmp_path):
+    path = str(tmp_path / 'games.csv')
+    store = ResultsStore(path)
+    store.append(record(0, 0))
+    with open(path, 'a') as f:
+        f.write('0,1,2x2,1,[1],"[[[0], [1]]]",0.5,"{""homotopy_paths"": }"\r\n')
+    store.append(record(0, 2))
+    assert [r['game'] for r in read_records(path)] == [0, 2]
+
+def test_read_records_keeps_first_record_of_a_game(tmp_path):
+    path = str(tmp_path / 'games.csv')
+    store = ResultsStore(path)
+    store.append(record(0, 0))
+    store.append(record(0, 1))
+    store.append(dict(record(0, 0), seconds=2.0))
+    store.append(record(1, 0))
+    assert list(read_records(path, unique=True)) == [record(0, 0), record(0, 1), record(1, 0)]
+    assert len(list(read_records(path))) == 4
+
+def test_store_with_rows_is_not_overwritten(tmp_path):
+    path = str(tmp_path / 'games.csv')
+    ResultsStore(path).append(record(0, 0))
+    with pytest.raises(FileExistsError):
+        ResultsStore(path)
+    assert [r['game'] for r in read_records(path)] == [0]
+
+    # A run with another seed adds to the store
+    ResultsStore(path, resume=True).append(record(1, 0))
+    assert len(list(read_records(path))) == 2
+
+    ResultsStore(path, overwrite=True)
+    assert list(read_records(path)) == []
+    ResultsStore(path)
@@ -0,0 +1,26 @@
+import time
+import pytest
+from src.data.gt_simulations import stream_results
+
+def square(x):
+    return x * x
+
+def slow_fail_on_three(x):
+    # Slow enough that the pool's task handler is waiting for a free slot when game 3 fails
+    time.sleep(0.05)
+    if x == 3:
+        raise ValueError('game 3 failed')
+    return x
+
+def test_stream_results_yields_every_result():
+    assert sorted(stream_results(square, range(50), num_processes=2, max_in_flight=4)) == [x * x for x in range(50)]
+
+def test_stream_results_raises_worker_error():
+    with pytest.raises(ValueError, match='game 3 failed'):
+        for _ in stream_results(slow_fail_on_three, range(100), num_processes=2, max_in_flight=2):
+            pass
+
+def test_stream_results_consumer_can_stop_early():
+    results = stream_results(slow_fail_on_three, range(100), num_processes=2, max_in_flight=2)
+    assert next(results) in (0, 1, 2)
+    results.close()
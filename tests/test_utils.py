@@ -0,0 +1,44 @@
+import itertools
+import numpy as np
+import pytest
+from src.models.gt_game_class import create_n_player_game
+from src.models.gt_utils import is_strategy_strictly_dominated, strictly_dominated_strategies
+
+def pairwise_dominated(game, player, strategy):
+    # The original pairwise loop: dominated if another strategy pays at least as much against every opponent profile
+    def get_payoff(indices, player, strategy):
+        payoff = game.payoffs[player][strategy]
+        for i, index in enumerate(indices):
+            if i != player:
+                payoff = payoff[index]
+        return payoff
+
+    other_strategies = [i for i in range(game.num_strategies[player]) if i != strategy]
+    for other_strategy in other_strategies:
+        temp = 0
+        temp2 = 0
+        for indices in itertools.product(*[range(game.num_strategies[p]) if p != player
+                                            else other_strategies for p in range(game.num_players)]):
+            temp2 += 1
+            if get_payoff(indices, player, strategy) > get_payoff(indices, player, other_strategy):
+                break
+            else:
+                temp += 1
+        if temp == temp2:
+            return True
+    return False
+
+@pytest.mark.parametrize('num_strategies', [(1, 3), (2, 2), (3, 4), (2, 2, 2), (3, 2, 3), (2, 3, 2, 2)])
+@pytest.mark.parametrize('seed', range(5))
+def test_mask_matches_pairwise_loop(num_strategies, seed):
+    # Small integer payoffs, so that ties and dominated strategies are common
+    rng = np.random.default_rng(seed)
+    payoffs = [rng.integers(0, 3, (num_strategies[p], *num_strategies[:p], *num_strategies[p + 1:])).astype(float)
+               for p in range(len(num_strategies))]
+    game = create_n_player_game(payoffs)
+    masks = strictly_dominated_strategies(game)
+    for p in range(game.num_players):
+        for s in range(game.num_strategies[p]):
+            expected = pairwise_dominated(game, p, s)
+            assert masks[p][s] == expected
+            assert is_strategy_strictly_dominated(game, p, s) == expected
@@ -0,0 +1,61 @@
+import threading
+import time
+from src.data.gt_work_queue import WorkQueue, hold_lease
+
+def test_queue_uses_rollback_journal(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'))
+    assert queue.connection.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    queue.close()
+
+def test_claim_renew_complete(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = WorkQueue(path)
+    queue.add_shards('sim1', [(2, 2)], [0], 5, 2)
+    queue.add_shards('sim1', [(2, 2)], [0], 5, 2)
+    assert queue.status() == {'pending': 3, 'leased': 0, 'done': 0}
+
+    shard = queue.claim('a', 60)
+    assert (shard['first_game'], shard['num_games']) == (0, 2)
+    other = WorkQueue(path)
+    assert other.claim('b', 60)['first_game'] == 2
+    assert queue.renew(shard['id'], 'a', 60)
+    assert not queue.renew(shard['id'], 'b', 60)
+    assert queue.complete(shard['id'], 'a')
+    assert queue.status() == {'pending': 1, 'leased': 1, 'done': 1}
+    other.close()
+    queue.close()
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'))
+    queue.add_shards('sim1', [(2, 2)], [0], 2, 2)
+    shard = queue.claim('a', -1)
+    assert queue.claim('b', 60)['id'] == shard['id']
+    assert not queue.complete(shard['id'], 'a')
+    assert queue.complete(shard['id'], 'b')
+    queue.close()
+
+def test_heartbeat_holds_lease_past_its_length(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = WorkQueue(path)
+    queue.add_shards('sim1', [(2, 2)], [0], 2, 2)
+    shard = queue.claim('a', 0.3)
+    stop, lost = threading.Event(), threading.Event()
+    heartbeat = threading.Thread(target=hold_lease, args=(path, shard['id'], 'a', 0.3, stop, lost))
+    heartbeat.start()
+    time.sleep(1)
+    assert queue.claim('b', 60) is None
+    stop.set()
+    heartbeat.join()
+    assert not lost.is_set()
+    queue.close()
+
+def test_heartbeat_reports_lost_lease(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = WorkQueue(path)
+    queue.add_shards('sim1', [(2, 2)], [0], 2, 2)
+    shard = queue.claim('a', -1)
+    assert queue.claim('b', 60)['id'] == shard['id']
+    stop, lost = threading.Event(), threading.Event()
+    hold_lease(path, shard['id'], 'a', 0.3, stop, lost)
+    assert lost.is_set()
+    queue.close()
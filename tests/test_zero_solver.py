@@ -0,0 +1,40 @@
+import numpy as np
+from src.models import zero_solver as zs
+from src.models.gt_game_class import create_n_player_game
+
+def random_block(shape, seed):
+    rng = np.random.default_rng(seed)
+    return create_n_player_game([rng.normal(size=[shape[p]] + [num for q, num in enumerate(shape) if q != p])
+                                 for p in range(len(shape))])
+
+def same_roots(roots1, roots2):
+    flat1 = sorted(tuple(np.round(np.concatenate(root), 6)) for root in roots1)
+    flat2 = sorted(tuple(np.round(np.concatenate(root), 6)) for root in roots2)
+    return flat1 == flat2
+
+def test_loose_tolerances_keep_the_roots():
+    for seed in (6, 7, 9, 15):
+        game = random_block([2, 2, 2], seed)
+        assert same_roots(zs.zero_solver(game, 1e-6, tracktol=1e-4, finaltol=1e-8), zs.zero_solver(game, 1e-6))
+
+def test_jumped_path_is_tracked_again(monkeypatch):
+    homotopy_roots = zs.homotopy_roots
+
+    def jumping_roots(payoffs, multihomogeneous, tracktol=zs.TRACKTOL, finaltol=zs.FINALTOL, singtol=zs.SINGTOL):
+        roots, status = homotopy_roots(payoffs, multihomogeneous, tracktol, finaltol, singtol)
+        if tracktol != zs.TRACKTOL:
+            # Every path to a finite zero ends at the one furthest from the positive orthant
+            finite = np.max(np.abs(roots), axis=0) < 1e8
+            distance = np.where(finite, roots.real.min(axis=0) - np.abs(roots.imag).max(axis=0), np.inf)
+            roots = roots.copy()
+            roots[:, finite] = roots[:, [np.argmin(distance)]]
+        return roots, status
+
+    # Blocks with an equilibrium
+    for seed in (6, 7, 9, 15):
+        game = random_block([2, 2, 2], seed)
+        expected = zs.zero_solver(game, 1e-6)
+        assert expected
+        monkeypatch.setattr(zs, 'homotopy_roots', jumping_roots)
+        assert same_roots(zs.zero_solver(game, 1e-6, tracktol=1e-4, finaltol=1e-8), expected)
+        monkeypatch.setattr(zs, 'homotopy_roots', homotopy_roots)